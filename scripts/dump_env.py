@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Gera um snapshot compilado da configuração do Vigilo
+
+Resolve e valida todas as variáveis de ambiente uma única vez e grava
+src/_config_compiled.py com atribuições literais. Em runtime, Config
+importa esse módulo (já em bytecode) em vez de ler o .env e o ambiente.
+
+ATENÇÃO: o arquivo gerado contém tokens em texto puro. Não versione
+e não o embuta em imagens (está no .dockerignore): monte-o no container
+em tempo de deploy. Enquanto existir, ele substitui o ambiente e o .env.
+
+Uso:
+    python scripts/dump_env.py
+"""
+
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+OUTPUT_PATH = os.path.join(SRC_DIR, '_config_compiled.py')
+
+sys.path.insert(0, SRC_DIR)
+
+
+def main():
+    """Função principal"""
+    try:
+        from config import Config, CONFIG_FIELDS
+
+        # Sempre resolve a partir do ambiente, ignorando um snapshot antigo
+        cfg = Config(use_compiled=False)
+    except ValueError as e:
+        print(f"❌ Erro na configuração: {e}")
+        sys.exit(1)
+
+    lines = [
+        '"""',
+        'Snapshot da configuração do Vigilo',
+        'Gerado automaticamente por scripts/dump_env.py - NÃO EDITE',
+        '"""',
+        '',
+    ]
+    for key in CONFIG_FIELDS:
+        lines.append(f"{key} = {getattr(cfg, key)!r}")
+
+    with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+
+    print(f"✅ Configuração compilada em {os.path.normpath(OUTPUT_PATH)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+Tipos de Alerta
+Enumeração compartilhada pelos monitores, notificador e heartbeat
+"""
+
+from enum import IntEnum
+
+
+class AlertType(IntEnum):
+    """
+    Tipos de alerta conhecidos
+
+    Os valores são contíguos a partir de 0 para servirem de índice no
+    controle de cooldown do Notifier. Nas fronteiras externas (n8n, logs)
+    usa-se sempre o nome (ex.: AlertType.CPU_CRITICAL.name).
+    """
+
+    CPU_CRITICAL = 0
+    RAM_CRITICAL = 1
+    DISK_CRITICAL = 2
+    CONTAINER_NOT_FOUND = 3
+    CONTAINER_NOT_RUNNING = 4
+    CONTAINER_UNHEALTHY = 5
+    DOCKER_CONNECTION_ERROR = 6
+    UNKNOWN = 7
@@ -4,47 +4,121 @@ Gerencia variáveis de ambiente com validação
 """
 
 import os
-from typing import List, Optional
+from functools import lru_cache
+from typing import FrozenSet, List, Mapping, Optional, Tuple
 from dotenv import load_dotenv
 
-# Carrega variáveis do arquivo .env se existir
-load_dotenv()
+# Arquivo .env na raiz do projeto, resolvido a partir deste módulo (e não do
+# diretório atual), para funcionar de qualquer lugar onde o script for executado
+_ENV_PATH = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, ".env")
+)
+
+# Carrega variáveis do arquivo .env apenas se ele existir
+# (em containers as variáveis normalmente já vêm do ambiente)
+if os.path.exists(_ENV_PATH):
+    load_dotenv(_ENV_PATH, override=False)
+
+# Campos com URL obrigatória (validados na mesma passada)
+_URL_FIELDS = ("N8N_HEARTBEAT_URL", "EVOLUTION_URL")
+
+# Esquemas aceitos para as URLs acima
+_HTTP_SCHEMES = ("http://", "https://")
+
+# Limiares percentuais: devem estar no intervalo (0, 100]
+_THRESHOLD_FIELDS = ("CPU_THRESHOLD", "RAM_THRESHOLD", "DISK_THRESHOLD")
+
+# Campos de configuração (também gravados pelo scripts/dump_env.py)
+CONFIG_FIELDS = (
+    "EVOLUTION_URL",
+    "EVOLUTION_TOKEN",
+    "EVOLUTION_INSTANCE",
+    "NOTIFY_NUMBER",
+    "N8N_HEARTBEAT_URL",
+    "CHECK_INTERVAL",
+    "REPORT_HOURS",
+    "TZ",
+    "AGENT_NAME",
+    "WATCH_ALL_CONTAINERS",
+    "WATCH_CONTAINERS",
+    "WATCH_CONTAINERS_ORDERED",
+    "IGNORE_CONTAINERS",
+    "CPU_THRESHOLD",
+    "RAM_THRESHOLD",
+    "DISK_THRESHOLD",
+    "PER_CPU",
+    "ALERT_COOLDOWN",
+    "LOG_LEVEL",
+)
 
 
 class Config:
     """Classe centralizada para gerenciar configurações do Vigilo"""
     
-    def __init__(self):
+    # Atributos fixos: acesso mais rápido e sem __dict__ por instância
+    __slots__ = CONFIG_FIELDS + ("_report_interval_s", "compiled_path")
+    
+    def __init__(self, env: Optional[Mapping[str, str]] = None,
+                 use_compiled: bool = True):
+        """
+        Carrega a configuração
+        
+        Args:
+            env: Variáveis a usar no lugar de os.environ (ex.: dicionário em
+                testes). Quando informado, o snapshot compilado é ignorado.
+            use_compiled: Se True, usa o snapshot gerado por scripts/dump_env.py
+                (src/_config_compiled.py) quando ele existir
+        """
+        # Caminho do snapshot compilado, quando a configuração veio dele
+        # (o ambiente e o .env são ignorados nesse caso)
+        self.compiled_path: Optional[str] = None
+        
+        if env is not None or not (use_compiled and self._load_compiled()):
+            self._load_env(env if env is not None else os.environ)
+        
+        # Intervalo de relatório em segundos, calculado uma única vez
+        self._report_interval_s: int = self.REPORT_HOURS * 3600
+    
+    def _load_env(self, env: Mapping[str, str]) -> None:
+        """
+        Carrega e valida a configuração a partir das variáveis de ambiente
+        
+        Args:
+            env: Mapeamento com as variáveis de ambiente
+        """
         # Configurações da Evolution API (WhatsApp)
-        self.EVOLUTION_URL: str = self._get_required_env("EVOLUTION_URL")
-        self.EVOLUTION_TOKEN: str = self._get_required_env("EVOLUTION_TOKEN")
-        self.EVOLUTION_INSTANCE: str = self._get_required_env("EVOLUTION_INSTANCE")
-        self.NOTIFY_NUMBER: str = self._get_required_env("NOTIFY_NUMBER")
+        self.EVOLUTION_URL: str = self._get_required_env(env, "EVOLUTION_URL")
+        self.EVOLUTION_TOKEN: str = self._get_required_env(env, "EVOLUTION_TOKEN")
+        self.EVOLUTION_INSTANCE: str = self._get_required_env(env, "EVOLUTION_INSTANCE")
+        self.NOTIFY_NUMBER: str = self._get_required_env(env, "NOTIFY_NUMBER")
         
         # Configuração do n8n Heartbeat
-        self.N8N_HEARTBEAT_URL: str = self._get_required_env("N8N_HEARTBEAT_URL")
+        self.N8N_HEARTBEAT_URL: str = self._get_required_env(env, "N8N_HEARTBEAT_URL")
         
         # Configurações de Temporização
-        self.CHECK_INTERVAL: int = int(os.getenv("CHECK_INTERVAL", "60"))
-        self.REPORT_HOURS: int = int(os.getenv("REPORT_HOURS", "4"))
+        self.CHECK_INTERVAL: int = int(env.get("CHECK_INTERVAL", "60"))
+        self.REPORT_HOURS: int = int(env.get("REPORT_HOURS", "4"))
         
         # Timezone
-        self.TZ: str = os.getenv("TZ", "America/Sao_Paulo")
+        self.TZ: str = env.get("TZ", "America/Sao_Paulo")
         
         # Nome personalizado do agente (aparece nas mensagens)
-        self.AGENT_NAME: str = os.getenv("AGENT_NAME", "")
+        self.AGENT_NAME: str = env.get("AGENT_NAME", "")
         
         # Modo de monitoramento de containers
-        self.WATCH_ALL_CONTAINERS: bool = os.getenv("WATCH_ALL_CONTAINERS", "true").lower() == "true"
+        self.WATCH_ALL_CONTAINERS: bool = env.get("WATCH_ALL_CONTAINERS", "true").lower() == "true"
         
         # Containers para monitoramento prioritário (apenas se WATCH_ALL_CONTAINERS=false)
-        watch_containers_str: str = os.getenv("WATCH_CONTAINERS", "")
-        self.WATCH_CONTAINERS: List[str] = [
+        # WATCH_CONTAINERS é um frozenset (pertinência em O(1));
+        # WATCH_CONTAINERS_ORDERED preserva a ordem configurada para exibição
+        watch_containers_str: str = env.get("WATCH_CONTAINERS", "")
+        self.WATCH_CONTAINERS_ORDERED: Tuple[str, ...] = tuple(
             c.strip() for c in watch_containers_str.split(",") if c.strip()
-        ]
+        )
+        self.WATCH_CONTAINERS: FrozenSet[str] = frozenset(self.WATCH_CONTAINERS_ORDERED)
         
         # Containers para IGNORAR no monitoramento automático
-        ignore_containers_str: str = os.getenv("IGNORE_CONTAINERS", "")
+        ignore_containers_str: str = env.get("IGNORE_CONTAINERS", "")
         self.IGNORE_CONTAINERS: List[str] = [
             c.strip() for c in ignore_containers_str.split(",") if c.strip()
         ]
@@ -53,23 +127,51 @@ class Config:
             self.IGNORE_CONTAINERS.append("vigilo-agent")
         
         # Limiares de alerta para recursos do host
-        self.CPU_THRESHOLD: float = float(os.getenv("CPU_THRESHOLD", "85.0"))
-        self.RAM_THRESHOLD: float = float(os.getenv("RAM_THRESHOLD", "90.0"))
-        self.DISK_THRESHOLD: float = float(os.getenv("DISK_THRESHOLD", "90.0"))
+        self.CPU_THRESHOLD: float = float(env.get("CPU_THRESHOLD", "85.0"))
+        self.RAM_THRESHOLD: float = float(env.get("RAM_THRESHOLD", "90.0"))
+        self.DISK_THRESHOLD: float = float(env.get("DISK_THRESHOLD", "90.0"))
+        
+        # Alerta de CPU pelo núcleo mais carregado em vez da média
+        self.PER_CPU: bool = env.get("PER_CPU", "false").lower() == "true"
         
         # Configuração de Cooldown para anti-spam (em segundos)
-        self.ALERT_COOLDOWN: int = int(os.getenv("ALERT_COOLDOWN", "1800"))  # 30 minutos
+        self.ALERT_COOLDOWN: int = int(env.get("ALERT_COOLDOWN", "1800"))  # 30 minutos
         
         # Log Level
-        self.LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+        self.LOG_LEVEL: str = env.get("LOG_LEVEL", "INFO")
         
         self._validate_config()
     
-    def _get_required_env(self, key: str) -> str:
+    def _load_compiled(self) -> bool:
+        """
+        Carrega a configuração a partir do snapshot compilado, se existir
+        
+        O snapshot já foi validado ao ser gerado, então não passa
+        novamente por _validate_config. Um snapshot incompleto (gerado
+        por uma versão anterior) é ignorado.
+        
+        Returns:
+            True se o snapshot foi carregado, False caso contrário
+        """
+        try:
+            import _config_compiled as compiled
+        except ImportError:
+            return False
+        
+        if not all(hasattr(compiled, key) for key in CONFIG_FIELDS):
+            return False
+        
+        for key in CONFIG_FIELDS:
+            setattr(self, key, getattr(compiled, key))
+        self.compiled_path = compiled.__file__
+        return True
+    
+    def _get_required_env(self, env: Mapping[str, str], key: str) -> str:
         """
         Obtém uma variável de ambiente obrigatória
         
         Args:
+            env: Mapeamento com as variáveis de ambiente
             key: Nome da variável de ambiente
             
         Returns:
@@ -78,7 +180,7 @@ class Config:
         Raises:
             ValueError: Se a variável não estiver definida
         """
-        value = os.getenv(key)
+        value = env.get(key)
         if not value:
             raise ValueError(
                 f"Variável de ambiente obrigatória '{key}' não está definida. "
@@ -88,13 +190,10 @@ class Config:
     
     def _validate_config(self) -> None:
         """Valida as configurações carregadas"""
-        # Valida URL do n8n
-        if not self.N8N_HEARTBEAT_URL.startswith(("http://", "https://")):
-            raise ValueError("N8N_HEARTBEAT_URL deve começar com http:// ou https://")
-        
-        # Valida URL da Evolution API
-        if not self.EVOLUTION_URL.startswith(("http://", "https://")):
-            raise ValueError("EVOLUTION_URL deve começar com http:// ou https://")
+        # Valida URLs (n8n e Evolution API)
+        for field in _URL_FIELDS:
+            if not getattr(self, field).startswith(_HTTP_SCHEMES):
+                raise ValueError(f"{field} deve começar com http:// ou https://")
         
         # Valida intervalos
         if self.CHECK_INTERVAL < 10:
@@ -104,18 +203,13 @@ class Config:
             raise ValueError("REPORT_HOURS deve ser no mínimo 1 hora")
         
         # Valida limiares
-        if not (0 < self.CPU_THRESHOLD <= 100):
-            raise ValueError("CPU_THRESHOLD deve estar entre 0 e 100")
-        
-        if not (0 < self.RAM_THRESHOLD <= 100):
-            raise ValueError("RAM_THRESHOLD deve estar entre 0 e 100")
-        
-        if not (0 < self.DISK_THRESHOLD <= 100):
-            raise ValueError("DISK_THRESHOLD deve estar entre 0 e 100")
+        for field in _THRESHOLD_FIELDS:
+            if not (0 < getattr(self, field) <= 100):
+                raise ValueError(f"{field} deve estar entre 0 e 100")
     
     def get_report_interval(self) -> int:
         """Retorna o intervalo de relatório em segundos"""
-        return self.REPORT_HOURS * 3600
+        return self._report_interval_s
     
     def __repr__(self) -> str:
         """Representação segura da configuração (sem expor tokens)"""
@@ -123,13 +217,19 @@ class Config:
             f"Config(CHECK_INTERVAL={self.CHECK_INTERVAL}, "
             f"REPORT_HOURS={self.REPORT_HOURS}, "
             f"WATCH_ALL_CONTAINERS={self.WATCH_ALL_CONTAINERS}, "
-            f"WATCH_CONTAINERS={self.WATCH_CONTAINERS}, "
+            f"WATCH_CONTAINERS={list(self.WATCH_CONTAINERS_ORDERED)}, "
             f"IGNORE_CONTAINERS={self.IGNORE_CONTAINERS}, "
             f"AGENT_NAME={self.AGENT_NAME or 'auto'}, "
             f"TZ={self.TZ})"
         )
 
 
+@lru_cache(maxsize=1)
+def _make_config() -> Config:
+    """Cria (uma única vez) a instância de configuração"""
+    return Config()
+
+
 # Instância global de configuração
-config = Config()
+config = _make_config()
 
@@ -5,18 +5,74 @@ Monitora containers Docker via Socket API
 
 import docker
 from docker.errors import DockerException, NotFound, APIError
-from typing import Dict, List, Any, Optional
+from docker.utils import version_lt
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Any, NamedTuple, Optional, Tuple
 import logging
+import os
+import time
+
+from alerts import AlertType
 
 logger = logging.getLogger(__name__)
 
+# Tamanho do pool HTTP do client Docker (também limita as coletas paralelas de stats)
+DOCKER_POOL_SIZE = 4
+
+# Validade (segundos) das consultas ao daemon compartilhadas dentro de um ciclo
+LIST_TTL = 2.0
+
+# Sufixos de health check no campo Status da listagem (ex.: "Up 5 minutes (healthy)")
+HEALTH_MARKERS = (
+    ("(healthy)", "healthy"),
+    ("(unhealthy)", "unhealthy"),
+    ("(health: starting)", "starting"),
+)
+
+# Raiz do cgroup v2 (contadores lidos diretamente, sem passar pelo daemon)
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+# Versão mínima da API do daemon com suporte a stats one-shot (Docker 20.10)
+ONE_SHOT_MIN_API = "1.41"
+
+# Diretório do container sob CGROUP_ROOT (driver systemd, depois cgroupfs)
+CGROUP_PATHS = ("system.slice/docker-{id}.scope", "docker/{id}")
+
+
+class ContainerInfo(NamedTuple):
+    """Informações de um container extraídas da listagem do daemon"""
+    
+    id: str
+    name: str
+    status: str
+    image: str
+    created: Any
+    health: Optional[str] = None
+    size_rw: Optional[int] = None
+    size_root_fs: Optional[int] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Converte para dicionário (para serialização ou logs)
+        
+        Returns:
+            Dicionário com os campos; "health" e os tamanhos só aparecem quando disponíveis
+        """
+        data = self._asdict()
+        for key in ("health", "size_rw", "size_root_fs"):
+            if data[key] is None:
+                del data[key]
+        return data
+
 
 class DockerMonitor:
     """Classe responsável por monitorar containers Docker"""
     
     def __init__(self, watch_containers: List[str] = None, 
                  watch_all: bool = True,
-                 ignore_containers: List[str] = None):
+                 ignore_containers: List[str] = None,
+                 ping_ttl: float = 30.0):
         """
         Inicializa o monitor Docker
         
@@ -24,74 +80,251 @@ class DockerMonitor:
             watch_containers: Lista de nomes de containers para monitoramento prioritário
             watch_all: Se True, monitora TODOS os containers (exceto ignorados)
             ignore_containers: Lista de containers para ignorar no monitoramento automático
+            ping_ttl: Tempo em segundos durante o qual um ping bem-sucedido é reaproveitado
         """
         self.watch_containers = watch_containers or []
         self.watch_all = watch_all
         self.ignore_containers = ignore_containers or []
+        # Conjuntos para checagem de pertinência em O(1)
+        self._watch_set = frozenset(self.watch_containers)
+        self._ignore_set = frozenset(self.ignore_containers)
+        self.ping_ttl = ping_ttl
         self.client: Optional[docker.DockerClient] = None
+        # Instante (monotonic) até o qual a conexão é considerada válida sem novo ping
+        self._ok_until = 0.0
+        # Última amostra de CPU do cgroup por container: {id: (usage_usec, monotonic)}
+        self._cgroup_cpu_prev: Dict[str, Tuple[int, float]] = {}
+        # Última amostra de CPU do daemon por container: {id: (total_usage, system_cpu_usage)}
+        self._daemon_cpu_prev: Dict[str, Tuple[int, int]] = {}
+        # Resultados de consultas ao daemon por chave: {chave: (monotonic, valor)}
+        self._cache: Dict[str, Tuple[float, Any]] = {}
         self._connect()
     
     def _connect(self) -> None:
         """Estabelece conexão com o Docker Socket"""
         try:
-            self.client = docker.from_env()
+            # Um único client de longa duração, com pool de conexões pequeno
+            self.client = docker.from_env(max_pool_size=DOCKER_POOL_SIZE)
             # Testa a conexão
             self.client.ping()
+            self._mark_ok()
             logger.info("Conexão com Docker estabelecida com sucesso")
-        except DockerException as e:
-            logger.error(f"Erro ao conectar com Docker: {e}")
+        except (DockerException, RequestsConnectionError) as e:
+            logger.error("Erro ao conectar com Docker: %s", e)
             logger.error("Certifique-se de que o socket Docker está montado: /var/run/docker.sock")
             self.client = None
     
+    def _reset_connection(self) -> None:
+        """Descarta o client atual; a reconexão ocorre na próxima chamada"""
+        if self.client is not None:
+            try:
+                self.client.close()
+            except Exception:
+                pass
+        self.client = None
+        self._ok_until = 0.0
+        self._cache.clear()
+    
+    def _mark_ok(self) -> None:
+        """Registra uma resposta bem-sucedida do daemon, válida por ping_ttl"""
+        self._ok_until = time.monotonic() + self.ping_ttl
+    
+    def _get_client(self) -> docker.DockerClient:
+        """
+        Retorna o client Docker, reconectando se necessário
+        
+        Raises:
+            DockerException: Se não for possível conectar
+        """
+        if self.client is None:
+            self._connect()
+            if self.client is None:
+                raise DockerException("Não conectado ao Docker")
+        return self.client
+    
+    def _list_containers(self, **kwargs) -> list:
+        """
+        Lista containers sem ping prévio; falhas de conexão invalidam o client
+        
+        Usa a API de baixo nível: uma única requisição que retorna dicionários
+        crus, sem objetos do SDK nem inspect por container.
+        
+        Raises:
+            DockerException, RequestsConnectionError: Em caso de falha
+        """
+        client = self._get_client()
+        try:
+            containers = client.api.containers(**kwargs)
+        except (APIError, RequestsConnectionError):
+            self._reset_connection()
+            raise
+        self._mark_ok()
+        return containers
+    
     def is_connected(self) -> bool:
-        """Verifica se está conectado ao Docker"""
+        """Verifica se está conectado ao Docker (ping reaproveitado por ping_ttl)"""
         if not self.client:
             return False
+        if time.monotonic() < self._ok_until:
+            return True
         try:
             self.client.ping()
+            self._mark_ok()
             return True
-        except:
+        except Exception:
+            self._ok_until = 0.0
             return False
     
-    def get_all_containers(self) -> List[Dict[str, Any]]:
+    def _cached(self, key: str, ttl: float, fn: Callable[[], Any]) -> Any:
         """
-        Lista todos os containers (rodando ou não)
+        Reaproveita o resultado de fn por ttl segundos
+        
+        Qualquer exceção em fn descarta todo o cache, para que a próxima
+        chamada consulte o daemon novamente.
         
+        Args:
+            key: Chave do resultado no cache
+            ttl: Validade do resultado em segundos
+            fn: Função que produz o resultado
+            
         Returns:
-            Lista de informações dos containers
+            Resultado em cache ou recém-calculado
         """
-        if not self.is_connected():
-            logger.error("Não conectado ao Docker")
-            return []
+        now = time.monotonic()
+        entry = self._cache.get(key)
+        if entry and now - entry[0] < ttl:
+            return entry[1]
         
         try:
-            containers = self.client.containers.list(all=True)
-            container_list = []
+            value = fn()
+        except Exception:
+            self._cache.clear()
+            raise
+        self._cache[key] = (now, value)
+        return value
+    
+    def _list_raw(self) -> list:
+        """
+        Lista todos os containers (dicionários crus da API)
+        
+        O resultado é reaproveitado por LIST_TTL segundos, para que o
+        resumo e a checagem de um mesmo ciclo façam uma única consulta.
+        
+        Returns:
+            Lista de containers retornados por /containers/json
+        """
+        return self._cached("raw", LIST_TTL, lambda: self._list_containers(all=True, size=False))
+    
+    def _list_containers_indexed(self) -> Tuple[Dict[str, ContainerInfo], int, int]:
+        """
+        Lista todos os containers em uma única passada, propagando erros de conexão
+        
+        O índice também é reaproveitado por LIST_TTL segundos.
+        
+        Returns:
+            Tupla (containers por nome, quantidade rodando, quantidade parada)
+        """
+        return self._cached("indexed", LIST_TTL, self._build_index)
+    
+    def _build_index(self) -> Tuple[Dict[str, ContainerInfo], int, int]:
+        """
+        Monta o índice de containers por nome a partir da listagem crua
+        
+        Returns:
+            Tupla (containers por nome, quantidade rodando, quantidade parada)
+        """
+        by_name: Dict[str, ContainerInfo] = {}
+        running_count = 0
+        
+        for container in self._list_raw():
+            container_info = self._to_info(container)
             
-            for container in containers:
-                container_info = {
-                    "id": container.short_id,
-                    "name": container.name,
-                    "status": container.status,
-                    "image": container.image.tags[0] if container.image.tags else container.image.short_id,
-                    "created": container.attrs.get("Created", ""),
-                }
-                
-                # Verifica health se disponível
-                health_status = self._get_health_status(container)
-                if health_status:
-                    container_info["health"] = health_status
-                
-                container_list.append(container_info)
+            by_name[container_info.name] = container_info
+            if container_info.status == "running":
+                running_count += 1
+        
+        logger.debug("Listados %d containers", len(by_name))
+        return by_name, running_count, len(by_name) - running_count
+    
+    def _to_info(self, container: Dict[str, Any]) -> ContainerInfo:
+        """
+        Converte um container da listagem crua em ContainerInfo
+        
+        Args:
+            container: Container retornado por /containers/json
             
-            logger.debug(f"Listados {len(container_list)} containers")
-            return container_list
+        Returns:
+            Informações do container (tamanhos apenas se a listagem os trouxer)
+        """
+        return ContainerInfo(
+            id=container["Id"][:12],
+            name=self._get_name(container),
+            status=container["State"],
+            image=container.get("Image", ""),
+            created=container.get("Created", ""),
+            health=self._get_health_status(container),
+            size_rw=container.get("SizeRw"),
+            size_root_fs=container.get("SizeRootFs"),
+        )
+    
+    def _collect_containers(self) -> List[ContainerInfo]:
+        """
+        Lista todos os containers, propagando erros de conexão
+        
+        Returns:
+            Lista de informações dos containers
+        """
+        by_name, _, _ = self._list_containers_indexed()
+        return list(by_name.values())
+    
+    def get_all_containers(self, with_size: bool = False) -> List[ContainerInfo]:
+        """
+        Lista todos os containers (rodando ou não)
+        
+        Args:
+            with_size: Se True, pede ao daemon o tamanho das camadas de cada
+                container (consulta cara e sem cache; use só quando necessário)
+        
+        Returns:
+            Lista de informações dos containers
+        """
+        try:
+            if with_size:
+                return [self._to_info(c) for c in self._list_containers(all=True, size=True)]
+            return self._collect_containers()
+        except (DockerException, RequestsConnectionError) as e:
+            logger.error("Erro na API do Docker ao listar containers: %s", e)
+            return []
+        except Exception as e:
+            logger.error("Erro inesperado ao listar containers: %s", e)
+            return []
+    
+    def get_containers_by_name(self, names: List[str]) -> List[ContainerInfo]:
+        """
+        Lista apenas os containers com os nomes informados
+        
+        O filtro é aplicado pelo daemon, que devolve só os candidatos. Como o
+        filtro "name" do Docker casa por trecho do nome, o resultado é
+        refinado aqui para nomes exatos.
+        
+        Args:
+            names: Nomes dos containers desejados
             
-        except APIError as e:
-            logger.error(f"Erro na API do Docker ao listar containers: {e}")
+        Returns:
+            Lista de informações dos containers encontrados
+        """
+        if not names:
+            return []
+        
+        wanted = frozenset(names)
+        try:
+            containers = self._list_containers(all=True, size=False, filters={"name": list(names)})
+            return [info for info in map(self._to_info, containers) if info.name in wanted]
+        except (DockerException, RequestsConnectionError) as e:
+            logger.error("Erro na API do Docker ao listar containers: %s", e)
             return []
         except Exception as e:
-            logger.error(f"Erro inesperado ao listar containers: {e}")
+            logger.error("Erro inesperado ao listar containers: %s", e)
             return []
     
     def get_running_containers(self) -> List[Dict[str, Any]]:
@@ -101,64 +334,189 @@ class DockerMonitor:
         Returns:
             Lista de containers rodando
         """
-        if not self.is_connected():
-            return []
-        
         try:
-            containers = self.client.containers.list(filters={"status": "running"})
+            containers = self._list_containers(filters={"status": "running"})
             container_list = []
             
-            for container in containers:
+            # Descarta amostras de CPU de containers que não estão mais rodando
+            running_ids = {c["Id"] for c in containers}
+            for samples in (self._cgroup_cpu_prev, self._daemon_cpu_prev):
+                for container_id in samples.keys() - running_ids:
+                    del samples[container_id]
+            
+            # Stats básicas (CPU e Memória) coletadas em paralelo quando
+            # for preciso recorrer ao daemon
+            all_stats = []
+            if containers:
+                with ThreadPoolExecutor(max_workers=DOCKER_POOL_SIZE) as pool:
+                    all_stats = list(pool.map(self._fetch_stats, containers))
+            
+            for container, stats in zip(containers, all_stats):
                 container_info = {
-                    "id": container.short_id,
-                    "name": container.name,
-                    "status": container.status,
-                    "image": container.image.tags[0] if container.image.tags else container.image.short_id,
+                    "id": container["Id"][:12],
+                    "name": self._get_name(container),
+                    "status": container["State"],
+                    "image": container.get("Image", ""),
                 }
                 
-                # Stats básicas (CPU e Memória) - não bloqueante
-                try:
-                    stats = container.stats(stream=False)
-                    container_info["cpu_percent"] = self._calculate_cpu_percent(stats)
+                if stats:
+                    # Sem amostra anterior não há delta; o campo fica ausente ("n/d")
+                    cpu_percent = self._calculate_cpu_percent(stats)
+                    if cpu_percent is not None:
+                        container_info["cpu_percent"] = cpu_percent
                     container_info["memory_mb"] = self._calculate_memory_usage(stats)
-                except:
-                    pass
                 
                 container_list.append(container_info)
             
             return container_list
             
         except Exception as e:
-            logger.error(f"Erro ao listar containers rodando: {e}")
+            logger.error("Erro ao listar containers rodando: %s", e)
             return []
     
-    def _get_health_status(self, container) -> Optional[str]:
+    def _get_name(self, container: Dict[str, Any]) -> str:
+        """
+        Obtém o nome do container a partir da listagem crua
+        
+        Args:
+            container: Container retornado por /containers/json
+            
+        Returns:
+            Nome do container (sem a barra inicial)
+        """
+        names = container.get("Names") or ["/" + container["Id"][:12]]
+        # Links legados aparecem como "/outro/alias"; o nome real tem uma única barra
+        for name in names:
+            if name.count("/") == 1:
+                return name[1:]
+        return names[0].lstrip("/")
+    
+    def _get_health_status(self, container: Dict[str, Any]) -> Optional[str]:
         """
         Obtém o status de health check do container
         
+        O daemon já inclui o health no campo Status da listagem, o que
+        evita um inspect por container.
+        
         Args:
-            container: Objeto do container Docker
+            container: Container retornado por /containers/json
             
         Returns:
             Status do health check ou None
         """
-        try:
-            health = container.attrs.get("State", {}).get("Health", {})
-            if health:
-                return health.get("Status", "none")
-        except:
-            pass
+        status_text = container.get("Status", "")
+        if status_text.endswith(")"):
+            for marker, health in HEALTH_MARKERS:
+                if status_text.endswith(marker):
+                    return health
         return None
     
-    def _calculate_cpu_percent(self, stats: Dict) -> float:
-        """Calcula percentual de uso de CPU"""
+    def _fetch_stats(self, container: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Obtém as stats de um container (cgroup se disponível, senão via daemon)
+        
+        No daemon usa one_shot (API >= 1.41), que responde sem aguardar a
+        segunda amostra, quando já existe uma coleta anterior do container
+        para calcular o delta de CPU. Na primeira coleta, e em daemons mais
+        antigos, usa a resposta completa, que traz precpu_stats.
+        
+        Args:
+            container: Container retornado por /containers/json
+            
+        Returns:
+            Stats do container ou None em caso de falha
+        """
+        stats = self._read_cgroup_stats(container["Id"])
+        if stats:
+            return stats
+        try:
+            api = self._get_client().api
+            # one_shot devolve precpu_stats vazio: só serve com uma coleta
+            # anterior do container. Sem ela (ou em daemons anteriores à
+            # API 1.41) a resposta completa traz o delta nela mesma
+            if (container["Id"] not in self._daemon_cpu_prev
+                    or version_lt(api.api_version, ONE_SHOT_MIN_API)):
+                return api.stats(container["Id"], stream=False)
+            return api.stats(container["Id"], stream=False, one_shot=True)
+        except Exception as e:
+            logger.debug("Erro ao obter stats de %s: %s", self._get_name(container), e)
+            return None
+    
+    def _read_cgroup_stats(self, container_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Lê os contadores de CPU e memória diretamente do cgroup v2
+        
+        Alguns bytes de texto por container, em vez do JSON completo de
+        /containers/{id}/stats.
+        
+        Args:
+            container_id: ID completo do container
+            
+        Returns:
+            Dicionário com usage_usec e memory_bytes, ou None se o cgroup
+            não estiver acessível
+        """
+        for template in CGROUP_PATHS:
+            path = os.path.join(CGROUP_ROOT, template.format(id=container_id))
+            try:
+                with open(os.path.join(path, "cpu.stat")) as f:
+                    usage_usec = next(
+                        int(line.split()[1]) for line in f if line.startswith("usage_usec")
+                    )
+                with open(os.path.join(path, "memory.current")) as f:
+                    memory_bytes = int(f.read())
+                break
+            except (OSError, ValueError, StopIteration):
+                continue
+        else:
+            return None
+        
+        return {
+            "container_id": container_id,
+            "usage_usec": usage_usec,
+            "memory_bytes": memory_bytes,
+            "read_at": time.monotonic()
+        }
+    
+    def _calculate_cpu_percent(self, stats: Dict) -> Optional[float]:
+        """
+        Calcula percentual de uso de CPU (stats do daemon ou do cgroup)
+        
+        Returns:
+            Percentual de CPU, ou None quando ainda não há leitura anterior
+            para calcular o delta
+        """
+        if "usage_usec" in stats:
+            # Cgroup: delta em relação à amostra anterior do mesmo container
+            previous = self._cgroup_cpu_prev.get(stats["container_id"])
+            self._cgroup_cpu_prev[stats["container_id"]] = (stats["usage_usec"], stats["read_at"])
+            if not previous:
+                return None
+            usage_delta = stats["usage_usec"] - previous[0]
+            elapsed = stats["read_at"] - previous[1]
+            if elapsed > 0 and usage_delta > 0:
+                return round(usage_delta / (elapsed * 1_000_000) * 100.0, 2)
+            return 0.0
+        
         try:
-            cpu_delta = stats["cpu_stats"]["cpu_usage"]["total_usage"] - \
-                       stats["precpu_stats"]["cpu_usage"]["total_usage"]
-            system_delta = stats["cpu_stats"]["system_cpu_usage"] - \
-                          stats["precpu_stats"]["system_cpu_usage"]
+            total_usage = stats["cpu_stats"]["cpu_usage"]["total_usage"]
+            system_usage = stats["cpu_stats"]["system_cpu_usage"]
             cpu_count = stats["cpu_stats"].get("online_cpus", 1)
             
+            # Guarda a coleta para que as próximas possam usar one_shot
+            previous = self._daemon_cpu_prev.get(stats.get("id"))
+            self._daemon_cpu_prev[stats.get("id")] = (total_usage, system_usage)
+            
+            precpu = stats.get("precpu_stats") or {}
+            if "system_cpu_usage" in precpu:
+                previous = (precpu["cpu_usage"]["total_usage"], precpu["system_cpu_usage"])
+            elif not previous:
+                # one_shot sem coleta anterior: não há delta a calcular
+                return None
+            
+            cpu_delta = total_usage - previous[0]
+            system_delta = system_usage - previous[1]
+            
             if system_delta > 0 and cpu_delta > 0:
                 cpu_percent = (cpu_delta / system_delta) * cpu_count * 100.0
                 return round(cpu_percent, 2)
@@ -167,7 +525,9 @@ class DockerMonitor:
         return 0.0
     
     def _calculate_memory_usage(self, stats: Dict) -> float:
-        """Calcula uso de memória em MB"""
+        """Calcula uso de memória em MB (stats do daemon ou do cgroup)"""
+        if "memory_bytes" in stats:
+            return round(stats["memory_bytes"] / (1024 * 1024), 2)
         try:
             memory_usage = stats["memory_stats"]["usage"]
             return round(memory_usage / (1024 * 1024), 2)
@@ -181,69 +541,91 @@ class DockerMonitor:
         Returns:
             Lista de alertas para containers com problemas
         """
-        if not self.is_connected():
+        if not self.watch_all and not self._watch_set:
+            logger.debug("Nenhum container configurado para monitoramento")
+            return []
+        
+        try:
+            containers = self._list_raw()
+        except (DockerException, RequestsConnectionError) as e:
+            logger.error("Erro ao consultar containers: %s", e)
             return [{
-                "type": "DOCKER_CONNECTION_ERROR",
+                "type": AlertType.DOCKER_CONNECTION_ERROR,
                 "severity": "critical",
                 "message": "❌ Não foi possível conectar ao Docker",
             }]
+        except Exception as e:
+            logger.error("Erro inesperado ao listar containers: %s", e)
+            return []
         
-        alerts = []
-        all_containers = self.get_all_containers()
-        
-        # Cria um mapa de containers por nome
-        container_map = {c["name"]: c for c in all_containers}
-        
-        # Define quais containers monitorar
+        # Define quais containers monitorar; a listagem crua é filtrada por
+        # nome antes, e só os selecionados viram ContainerInfo
+        named = ((self._get_name(c), c) for c in containers)
         if self.watch_all:
             # Monitora TODOS, exceto os ignorados
-            containers_to_check = [
-                name for name in container_map.keys() 
-                if name not in self.ignore_containers
-            ]
-            logger.debug(f"Monitorando TODOS os containers (exceto: {self.ignore_containers})")
+            selected = {name: self._to_info(c) for name, c in named if name not in self._ignore_set}
+            containers_to_check = list(selected)
+            logger.debug("Monitorando TODOS os containers (exceto: %s)", self.ignore_containers)
         else:
             # Monitora apenas os especificados
+            selected = {name: self._to_info(c) for name, c in named if name in self._watch_set}
             containers_to_check = self.watch_containers
-            if not containers_to_check:
-                logger.debug("Nenhum container configurado para monitoramento")
-                return []
-            logger.debug(f"Monitorando containers específicos: {containers_to_check}")
+            logger.debug("Monitorando containers específicos: %s", containers_to_check)
+        
+        return self.alerts_for(containers_to_check, selected)
+    
+    def alerts_for(self, names: List[str],
+                   by_name: Dict[str, ContainerInfo]) -> List[Dict[str, Any]]:
+        """
+        Gera os alertas de status e health para containers já listados
+        
+        Permite reaproveitar uma listagem feita pelo chamador (ex.: filtrada
+        pelo daemon com get_containers_by_name) sem consultar o daemon de novo.
+        
+        Args:
+            names: Nomes a verificar, na ordem dos alertas
+            by_name: Containers encontrados, indexados por nome
+            
+        Returns:
+            Lista de alertas para containers com problemas
+        """
+        alerts = []
         
-        for watched_name in containers_to_check:
-            if watched_name not in container_map:
+        for watched_name in names:
+            container = by_name.get(watched_name)
+            if container is None:
                 # Container não encontrado
                 alerts.append({
-                    "type": "CONTAINER_NOT_FOUND",
+                    "type": AlertType.CONTAINER_NOT_FOUND,
                     "severity": "critical",
                     "container": watched_name,
                     "message": f"❌ Container '{watched_name}' não encontrado!",
                 })
                 continue
             
-            container = container_map[watched_name]
+            status = container.status
             
             # Verifica se está rodando
-            if container["status"] != "running":
+            if status != "running":
                 alerts.append({
-                    "type": "CONTAINER_NOT_RUNNING",
+                    "type": AlertType.CONTAINER_NOT_RUNNING,
                     "severity": "critical",
                     "container": watched_name,
-                    "status": container["status"],
-                    "message": f"🔴 Container '{watched_name}' está {container['status'].upper()}!",
+                    "status": status,
+                    "message": f"🔴 Container '{watched_name}' está {status.upper()}!",
                 })
             
             # Verifica health check se disponível
-            if "health" in container and container["health"] == "unhealthy":
+            if container.health == "unhealthy":
                 alerts.append({
-                    "type": "CONTAINER_UNHEALTHY",
+                    "type": AlertType.CONTAINER_UNHEALTHY,
                     "severity": "high",
                     "container": watched_name,
                     "message": f"⚠️ Container '{watched_name}' está UNHEALTHY!",
                 })
         
         if alerts:
-            logger.warning(f"Detectados {len(alerts)} problemas em containers monitorados")
+            logger.warning("Detectados %d problemas em containers monitorados", len(alerts))
         
         return alerts
     
@@ -254,49 +636,42 @@ class DockerMonitor:
         Returns:
             String formatada com resumo Docker
         """
-        if not self.is_connected():
-            return "❌ *Docker:* Não conectado"
-        
         try:
-            all_containers = self.get_all_containers()
-            running = [c for c in all_containers if c["status"] == "running"]
-            stopped = [c for c in all_containers if c["status"] != "running"]
+            by_name, running_count, stopped_count = self._list_containers_indexed()
             
-            summary = f"🐳 *Docker:* {len(running)} rodando / {len(stopped)} parados"
+            summary = f"🐳 *Docker:* {running_count} rodando / {stopped_count} parados"
             
             # Determina quais containers exibir
             if self.watch_all:
                 # Mostra TODOS os containers (exceto ignorados)
                 containers_to_show = [
-                    c for c in all_containers 
-                    if c["name"] not in self.ignore_containers
+                    c for c in by_name.values() 
+                    if c.name not in self._ignore_set
                 ]
                 
                 if containers_to_show:
                     summary += "\n\n*Status dos Containers:*"
-                    for container in sorted(containers_to_show, key=lambda x: x["name"]):
-                        emoji = "🟢" if container["status"] == "running" else "🔴"
+                    for container in sorted(containers_to_show, key=lambda x: x.name):
+                        emoji = "🟢" if container.status == "running" else "🔴"
                         health = ""
-                        if "health" in container:
-                            if container["health"] == "healthy":
-                                health = " ✓"
-                            elif container["health"] == "unhealthy":
-                                health = " ⚠️"
-                        summary += f"\n{emoji} {container['name']}{health}"
+                        if container.health == "healthy":
+                            health = " ✓"
+                        elif container.health == "unhealthy":
+                            health = " ⚠️"
+                        summary += f"\n{emoji} {container.name}{health}"
             else:
                 # Mostra apenas os monitorados específicos
                 if self.watch_containers:
                     watched_status = []
                     for name in self.watch_containers:
-                        container = next((c for c in all_containers if c["name"] == name), None)
+                        container = by_name.get(name)
                         if container:
-                            emoji = "🟢" if container["status"] == "running" else "🔴"
+                            emoji = "🟢" if container.status == "running" else "🔴"
                             health = ""
-                            if "health" in container:
-                                if container["health"] == "healthy":
-                                    health = " ✓"
-                                elif container["health"] == "unhealthy":
-                                    health = " ⚠️"
+                            if container.health == "healthy":
+                                health = " ✓"
+                            elif container.health == "unhealthy":
+                                health = " ⚠️"
                             watched_status.append(f"{emoji} {name}{health}")
                         else:
                             watched_status.append(f"❌ {name}")
@@ -306,7 +681,10 @@ class DockerMonitor:
             
             return summary
             
+        except (DockerException, RequestsConnectionError) as e:
+            logger.error("Erro ao consultar Docker para o resumo: %s", e)
+            return "❌ *Docker:* Não conectado"
         except Exception as e:
-            logger.error(f"Erro ao gerar resumo Docker: {e}")
+            logger.error("Erro ao gerar resumo Docker: %s", e)
             return f"❌ *Docker:* Erro ao coletar dados"
 
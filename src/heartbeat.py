@@ -4,11 +4,16 @@ Envia sinais periódicos para n8n para garantir que o agente está vivo
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import socket
 import logging
+import threading
 from typing import Dict, Any, Optional
 
+from json_utils import dumps
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,9 +35,59 @@ class Heartbeat:
         self.consecutive_failures = 0
         self.total_sent = 0
         self.total_failed = 0
+        self._session = self._build_session()
+        
+        # Payload reaproveitado entre envios: os campos invariantes são
+        # definidos uma única vez e os dinâmicos são atualizados no lugar
+        self._payload_template: Dict[str, Any] = {
+            "agent_name": self.hostname,
+            "status": "alive",
+            "timestamp": 0,
+            "consecutive_failures": 0,
+            "total_sent": 0,
+            "total_failed": 0
+        }
+        self._stats_template: Dict[str, Any] = {
+            "cpu_percent": 0,
+            "ram_percent": 0,
+            "disk_percent": 0,
+            "uptime_seconds": 0
+        }
+        self._lock = threading.Lock()
         
-        logger.info(f"Heartbeat configurado para {webhook_url}")
-        logger.info(f"Nome do agente: {self.hostname}")
+        logger.info("Heartbeat configurado para %s", webhook_url)
+        logger.info("Nome do agente: %s", self.hostname)
+    
+    def _build_session(self) -> requests.Session:
+        """
+        Cria uma sessão HTTP persistente (keep-alive) para o webhook
+        
+        Returns:
+            Sessão com pool de conexões e retry configurados
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=4,
+            # Retenta falhas transitórias (conexão e 5xx) dentro da mesma
+            # chamada, com backoff exponencial. Timeouts de leitura não são
+            # retentados para não duplicar heartbeats já recebidos.
+            max_retries=Retry(
+                total=3,
+                read=0,
+                backoff_factor=0.3,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset(["POST"]),
+                raise_on_status=False
+            )
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({
+            "Content-Type": "application/json",
+            "Connection": "keep-alive"
+        })
+        return session
     
     def _get_hostname(self) -> str:
         """
@@ -43,45 +98,43 @@ class Heartbeat:
         """
         try:
             return socket.gethostname()
-        except:
+        except OSError:
             return "unknown_host"
     
-    def _build_payload(self, stats: Optional[Dict[str, Any]] = None, 
-                       extra_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def _serialize_payload(self, stats: Optional[Dict[str, Any]] = None, 
+                           extra_data: Optional[Dict[str, Any]] = None) -> bytes:
         """
-        Constrói o payload do heartbeat
+        Atualiza o payload reaproveitado e o serializa
         
         Args:
             stats: Estatísticas do sistema (opcional)
             extra_data: Dados adicionais para incluir (opcional)
             
         Returns:
-            Payload formatado para n8n
+            Payload formatado para n8n, em JSON
         """
-        payload = {
-            "agent_name": self.hostname,
-            "status": "alive",
-            "timestamp": int(time.time()),
-            "consecutive_failures": self.consecutive_failures,
-            "total_sent": self.total_sent,
-            "total_failed": self.total_failed
-        }
-        
-        # Adiciona estatísticas se fornecidas
-        if stats:
-            # Extrai apenas informações resumidas
-            payload["stats"] = {
-                "cpu_percent": stats.get("cpu_percent", 0),
-                "ram_percent": stats.get("ram_percent", 0),
-                "disk_percent": stats.get("disk_percent", 0),
-                "uptime_seconds": stats.get("uptime_seconds", 0)
-            }
-        
-        # Adiciona dados extras se fornecidos
-        if extra_data:
-            payload.update(extra_data)
-        
-        return payload
+        with self._lock:
+            payload = self._payload_template
+            payload["timestamp"] = int(time.time())
+            payload["consecutive_failures"] = self.consecutive_failures
+            payload["total_sent"] = self.total_sent
+            payload["total_failed"] = self.total_failed
+            
+            # Adiciona estatísticas se fornecidas (apenas informações resumidas)
+            if stats:
+                stats_view = self._stats_template
+                # Arredondado aqui: as stats internas guardam os floats crus
+                for key in stats_view:
+                    stats_view[key] = round(stats.get(key, 0), 2)
+                payload["stats"] = stats_view
+            else:
+                payload.pop("stats", None)
+            
+            # Dados extras não entram no template compartilhado
+            if extra_data:
+                return dumps({**payload, **extra_data})
+            
+            return dumps(payload)
     
     def send(self, stats: Optional[Dict[str, Any]] = None, 
              extra_data: Optional[Dict[str, Any]] = None) -> bool:
@@ -96,57 +149,54 @@ class Heartbeat:
             True se enviado com sucesso, False caso contrário
         """
         try:
-            payload = self._build_payload(stats, extra_data)
+            body = self._serialize_payload(stats, extra_data)
             
-            logger.debug(f"Enviando heartbeat para n8n: {self.hostname}")
+            logger.debug("Enviando heartbeat para n8n: %s", self.hostname)
             
-            response = requests.post(
+            response = self._session.post(
                 self.webhook_url,
-                json=payload,
-                timeout=self.timeout,
-                headers={"Content-Type": "application/json"}
+                data=body,
+                timeout=self.timeout
             )
             
             if response.status_code in [200, 201, 204]:
                 logger.debug("Heartbeat enviado com sucesso")
-                self.total_sent += 1
-                self.consecutive_failures = 0
+                with self._lock:
+                    self.total_sent += 1
+                    self.consecutive_failures = 0
                 return True
             else:
                 logger.warning(
-                    f"Heartbeat retornou status {response.status_code}: {response.text[:100]}"
+                    "Heartbeat retornou status %s: %s", response.status_code, response.text[:100]
                 )
                 self._handle_failure()
                 return False
                 
-        except requests.exceptions.Timeout:
-            logger.warning(f"Timeout ao enviar heartbeat para n8n (>{self.timeout}s)")
-            self._handle_failure()
-            return False
-            
-        except requests.exceptions.ConnectionError:
-            logger.warning("Erro de conexão ao enviar heartbeat para n8n")
+        except requests.exceptions.RequestException as e:
+            # Retries já esgotados pelo adapter da sessão
+            logger.warning("Falha ao enviar heartbeat para n8n: %s", e)
             self._handle_failure()
             return False
             
         except Exception as e:
-            logger.error(f"Erro inesperado ao enviar heartbeat: {e}")
+            logger.error("Erro inesperado ao enviar heartbeat: %s", e)
             self._handle_failure()
             return False
     
     def _handle_failure(self) -> None:
         """Registra uma falha no envio de heartbeat"""
-        self.consecutive_failures += 1
-        self.total_failed += 1
+        with self._lock:
+            self.consecutive_failures += 1
+            self.total_failed += 1
         
         # Log mais visível se muitas falhas consecutivas
         if self.consecutive_failures >= 5:
             logger.error(
-                f"⚠️ {self.consecutive_failures} falhas consecutivas ao enviar heartbeat!"
+                "⚠️ %d falhas consecutivas ao enviar heartbeat!", self.consecutive_failures
             )
         elif self.consecutive_failures >= 3:
             logger.warning(
-                f"⚠️ {self.consecutive_failures} falhas consecutivas ao enviar heartbeat"
+                "⚠️ %d falhas consecutivas ao enviar heartbeat", self.consecutive_failures
             )
     
     def send_event(self, event_type: str, event_data: Dict[str, Any]) -> bool:
@@ -209,9 +259,9 @@ class Heartbeat:
         }
         
         try:
-            response = requests.post(
+            response = self._session.post(
                 self.webhook_url,
-                json=test_payload,
+                data=dumps(test_payload),
                 timeout=self.timeout
             )
             
@@ -219,11 +269,11 @@ class Heartbeat:
                 logger.info("Conexão com n8n webhook OK")
                 return True
             else:
-                logger.warning(f"n8n webhook respondeu com status {response.status_code}")
+                logger.warning("n8n webhook respondeu com status %s", response.status_code)
                 return False
                 
         except Exception as e:
-            logger.error(f"Erro ao testar conexão com n8n: {e}")
+            logger.error("Erro ao testar conexão com n8n: %s", e)
             return False
     
     def get_stats(self) -> Dict[str, Any]:
@@ -246,4 +296,7 @@ class Heartbeat:
             "consecutive_failures": self.consecutive_failures,
             "success_rate": round(success_rate, 2)
         }
-
+    
+    def close(self) -> None:
+        """Fecha a sessão HTTP e libera as conexões do pool"""
+        self._session.close()
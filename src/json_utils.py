@@ -0,0 +1,27 @@
+"""
+Serialização JSON
+Usa orjson quando disponível, com fallback para o json da biblioteca padrão
+"""
+
+from typing import Any
+
+try:
+    import orjson
+
+    # Já retorna bytes UTF-8, prontos para o corpo da requisição
+    dumps = orjson.dumps
+
+except ImportError:
+    import json
+
+    def dumps(obj: Any) -> bytes:
+        """
+        Serializa um objeto em JSON (UTF-8)
+
+        Args:
+            obj: Objeto a serializar
+
+        Returns:
+            JSON codificado em bytes
+        """
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -7,17 +7,26 @@ import time
 import logging
 import sys
 import signal
-from datetime import datetime
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional
 
 from config import config
 from system_mon import SystemMonitor
-from docker_mon import DockerMonitor
 from notifier import Notifier
 from heartbeat import Heartbeat
+from alerts import AlertType
+
+if TYPE_CHECKING:
+    from docker_mon import DockerMonitor
 
 
 # Configuração de logging
+# Thread/processo não aparecem no formato; evita coletá-los a cada registro
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
 logging.basicConfig(
     level=getattr(logging, config.LOG_LEVEL.upper(), logging.INFO),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -28,6 +37,9 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Tempo máximo (segundos) que o shutdown espera a thread de inicialização
+STARTUP_JOIN_TIMEOUT = 15.0
+
 
 class VigiloAgent:
     """Classe principal do agente Vigilo"""
@@ -38,18 +50,32 @@ class VigiloAgent:
         logger.info("🚀 Iniciando Vigilo Agent")
         logger.info("=" * 60)
         
+        # O logging só é configurado depois de carregar a configuração,
+        # então a origem dela é registrada aqui
+        if config.compiled_path:
+            logger.info(
+                "Configuração carregada do snapshot compilado %s "
+                "(variáveis de ambiente e .env ignorados)", config.compiled_path
+            )
+        
         # Inicializa monitores
         self.system_monitor = SystemMonitor(
             cpu_threshold=config.CPU_THRESHOLD,
             ram_threshold=config.RAM_THRESHOLD,
-            disk_threshold=config.DISK_THRESHOLD
+            disk_threshold=config.DISK_THRESHOLD,
+            per_cpu=config.PER_CPU
         )
         
-        self.docker_monitor = DockerMonitor(
-            watch_containers=config.WATCH_CONTAINERS,
-            watch_all=config.WATCH_ALL_CONTAINERS,
-            ignore_containers=config.IGNORE_CONTAINERS
-        )
+        # O SDK Docker só é importado se houver containers a monitorar
+        self.docker_monitor: Optional["DockerMonitor"] = None
+        if config.WATCH_ALL_CONTAINERS or config.WATCH_CONTAINERS:
+            from docker_mon import DockerMonitor
+            self.docker_monitor = DockerMonitor(
+                watch_containers=config.WATCH_CONTAINERS_ORDERED,
+                watch_all=config.WATCH_ALL_CONTAINERS,
+                ignore_containers=config.IGNORE_CONTAINERS,
+                ping_ttl=config.CHECK_INTERVAL / 2
+            )
         
         self.notifier = Notifier(
             evolution_url=config.EVOLUTION_URL,
@@ -64,31 +90,66 @@ class VigiloAgent:
             agent_name=config.AGENT_NAME
         )
         
+        # Workers para sobrepor operações de I/O independentes dentro de um ciclo
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="vigilo")
+        
         # Controle de execução
-        self.running = True
-        self.last_report_time = time.time()
+        # Sinalizado pelo handler de SIGINT/SIGTERM; acorda a espera entre ciclos
+        self._stop_event = threading.Event()
+        # Relatórios periódicos medidos em tempo monotônico (imune a ajustes de relógio)
+        self._report_interval_s = config.get_report_interval()
+        self.last_report_time = time.monotonic()
         self.check_count = 0
         
+        # Os monitores não são thread-safe: a checagem do loop e o relatório
+        # inicial (thread de inicialização) nunca os usam ao mesmo tempo
+        self._check_lock = threading.Lock()
+        # Última coleta do loop; o relatório inicial a reaproveita em vez de
+        # reiniciar a janela de CPU do SystemMonitor
+        self._last_probe: Optional[dict] = None
+        
         # Registra handlers para shutdown gracioso
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
         
-        logger.info(f"Configuração: Checagem a cada {config.CHECK_INTERVAL}s")
-        logger.info(f"Relatórios a cada {config.REPORT_HOURS}h")
+        logger.info("Configuração: Checagem a cada %ss", config.CHECK_INTERVAL)
+        logger.info("Relatórios a cada %sh", config.REPORT_HOURS)
         
         if config.WATCH_ALL_CONTAINERS:
-            logger.info(f"Modo: Monitorando TODOS os containers")
+            logger.info("Modo: Monitorando TODOS os containers")
             if config.IGNORE_CONTAINERS:
-                logger.info(f"Ignorando: {config.IGNORE_CONTAINERS}")
+                logger.info("Ignorando: %s", config.IGNORE_CONTAINERS)
+        elif config.WATCH_CONTAINERS:
+            logger.info("Modo: Monitorando containers específicos")
+            logger.info("Containers monitorados: %s", list(config.WATCH_CONTAINERS_ORDERED))
         else:
-            logger.info(f"Modo: Monitorando containers específicos")
-            logger.info(f"Containers monitorados: {config.WATCH_CONTAINERS or 'Nenhum'}")
+            logger.info("Modo: Monitoramento Docker desativado (nenhum container configurado)")
         
-        # Testa conexões
-        self._test_connections()
+        # Testes de conexão, notificações e relatório inicial rodam em
+        # segundo plano: o loop de monitoramento começa sem esperar a rede
+        self._startup_thread = threading.Thread(
+            target=self._async_startup, name="vigilo-startup", daemon=True
+        )
+        self._startup_thread.start()
+    
+    def _async_startup(self) -> None:
+        """
+        Executa as etapas de inicialização que dependem da rede
         
-        # Envia notificação de startup
-        self._send_startup_notifications()
+        Cada etapa só começa se o agente ainda não estiver sendo encerrado.
+        """
+        try:
+            # Testa conexões
+            if self._stop_event.is_set():
+                return
+            self._test_connections()
+            
+            # Envia notificação de startup
+            if self._stop_event.is_set():
+                return
+            self._send_startup_notifications()
+        except Exception as e:
+            logger.error("Erro na inicialização em segundo plano: %s", e)
         
         # Envia relatório inicial logo após inicialização
         self._send_initial_report()
@@ -101,8 +162,8 @@ class VigiloAgent:
             signum: Número do sinal
             frame: Frame atual
         """
-        logger.info(f"\n⚠️ Sinal {signum} recebido. Encerrando graciosamente...")
-        self.running = False
+        logger.info("\n⚠️ Sinal %s recebido. Encerrando graciosamente...", signum)
+        self._stop_event.set()
     
     def _test_connections(self) -> None:
         """Testa todas as conexões externas"""
@@ -121,7 +182,9 @@ class VigiloAgent:
             logger.warning("⚠️ n8n Webhook: Falha na conexão")
         
         # Testa Docker
-        if self.docker_monitor.is_connected():
+        if self.docker_monitor is None:
+            logger.info("ℹ️ Docker: Monitoramento desativado")
+        elif self.docker_monitor.is_connected():
             logger.info("✅ Docker: Conectado")
         else:
             logger.error("❌ Docker: NÃO conectado - Verifique o socket!")
@@ -142,14 +205,15 @@ class VigiloAgent:
             logger.info("📊 Gerando relatório inicial...")
             
             # Aguarda 2 segundos para dar tempo do sistema estabilizar
-            import time
-            time.sleep(2)
+            # (interrompido se o agente for encerrado nesse meio tempo)
+            if self._stop_event.wait(2):
+                return
             
-            # Coleta estatísticas
-            system_stats = self.system_monitor.get_system_stats()
-            
-            # Gera relatório completo
-            report = self._generate_full_report(system_stats)
+            # Coleta estatísticas e gera o relatório completo; reaproveita a
+            # última coleta do loop quando já houver uma
+            with self._check_lock:
+                system_stats = self.system_monitor.full_stats(self._last_probe)
+                report = self._generate_full_report(system_stats)
             
             # Adiciona cabeçalho especial para relatório inicial
             initial_header = "🚀 *RELATÓRIO INICIAL*\n\n"
@@ -162,7 +226,7 @@ class VigiloAgent:
                 logger.warning("⚠️ Falha ao enviar relatório inicial")
                 
         except Exception as e:
-            logger.error(f"Erro ao enviar relatório inicial: {e}")
+            logger.error("Erro ao enviar relatório inicial: %s", e)
             # Não interrompe a inicialização se falhar
     
     def _should_send_report(self) -> bool:
@@ -172,11 +236,7 @@ class VigiloAgent:
         Returns:
             True se deve enviar relatório
         """
-        current_time = time.time()
-        time_since_last_report = current_time - self.last_report_time
-        report_interval = config.get_report_interval()
-        
-        return time_since_last_report >= report_interval
+        return time.monotonic() - self.last_report_time >= self._report_interval_s
     
     def _generate_full_report(self, system_stats: dict) -> str:
         """
@@ -192,7 +252,10 @@ class VigiloAgent:
         system_report = self.system_monitor.get_formatted_report(system_stats)
         
         # Relatório do Docker
-        docker_report = self.docker_monitor.get_docker_summary()
+        if self.docker_monitor is not None:
+            docker_report = self.docker_monitor.get_docker_summary()
+        else:
+            docker_report = "🐳 *Docker:* Monitoramento desativado"
         
         # Estatísticas do agente
         heartbeat_stats = self.heartbeat.get_stats()
@@ -221,53 +284,65 @@ class VigiloAgent:
         if not all_alerts:
             return
         
-        logger.warning(f"⚠️ Detectados {len(all_alerts)} alertas")
+        logger.warning("⚠️ Detectados %d alertas", len(all_alerts))
         
         # Envia alertas via WhatsApp
         sent_count = self.notifier.send_alerts(all_alerts)
-        logger.info(f"📱 {sent_count}/{len(all_alerts)} alertas enviados via WhatsApp")
+        logger.info("📱 %s/%d alertas enviados via WhatsApp", sent_count, len(all_alerts))
         
-        # Notifica n8n sobre os alertas
-        alert_types = [alert.get("type", "UNKNOWN") for alert in all_alerts]
+        # Notifica n8n sobre os alertas (tipos pelo nome)
+        alert_types = [alert.get("type", AlertType.UNKNOWN).name for alert in all_alerts]
         self.heartbeat.send_alert_event(len(all_alerts), alert_types)
     
     def _perform_check(self) -> None:
         """Realiza uma checagem completa do sistema"""
+        with self._check_lock:
+            self._run_check()
+    
+    def _run_check(self) -> None:
+        """Executa as etapas da checagem (chamado com _check_lock adquirido)"""
         try:
             self.check_count += 1
-            logger.info(f"🔍 Checagem #{self.check_count}")
+            logger.info("🔍 Checagem #%s", self.check_count)
+            
+            # 1. Verifica containers Docker em paralelo com a coleta do sistema
+            docker_future = None
+            if self.docker_monitor is not None:
+                docker_future = self._executor.submit(self.docker_monitor.check_watched_containers)
             
-            # 1. Coleta estatísticas do sistema
-            system_stats = self.system_monitor.get_system_stats()
+            # 2. Coleta as métricas do ciclo (o restante só para o relatório)
+            system_stats = self.system_monitor.quick_probe()
+            self._last_probe = system_stats
             
-            # 2. Verifica limiares do sistema
+            # 3. Verifica limiares do sistema
             system_alerts = self.system_monitor.check_thresholds(system_stats)
+            docker_alerts = docker_future.result() if docker_future else []
             
-            # 3. Verifica containers Docker
-            docker_alerts = self.docker_monitor.check_watched_containers()
+            # 4. Envia heartbeat para n8n em paralelo com alertas e relatório
+            heartbeat_future = self._executor.submit(self.heartbeat.send, stats=system_stats)
             
-            # 4. Processa alertas
+            # 5. Processa alertas
             if system_alerts or docker_alerts:
                 self._process_alerts(system_alerts, docker_alerts)
             else:
                 logger.info("✅ Sistema OK - Nenhum alerta")
             
-            # 5. Envia heartbeat para n8n
-            self.heartbeat.send(stats=system_stats)
-            
             # 6. Verifica se deve enviar relatório periódico
             if self._should_send_report():
                 logger.info("📊 Enviando relatório periódico...")
-                report = self._generate_full_report(system_stats)
+                report = self._generate_full_report(self.system_monitor.full_stats(system_stats))
                 
                 if self.notifier.send_report(report):
                     logger.info("✅ Relatório enviado com sucesso")
-                    self.last_report_time = time.time()
+                    self.last_report_time = time.monotonic()
                 else:
                     logger.warning("⚠️ Falha ao enviar relatório")
             
+            heartbeat_future.result()
+            
         except Exception as e:
-            logger.error(f"❌ Erro durante checagem: {e}", exc_info=True)
+            logger.error("❌ Erro durante checagem: %s", e)
+            logger.debug("Detalhes do erro durante checagem", exc_info=True)
     
     def run(self) -> None:
         """Loop principal do agente"""
@@ -275,14 +350,14 @@ class VigiloAgent:
         logger.info("Pressione Ctrl+C para encerrar")
         logger.info("=" * 60)
         
-        while self.running:
+        while not self._stop_event.is_set():
             try:
                 # Realiza checagem
                 self._perform_check()
                 
                 # Aguarda próximo ciclo
-                logger.debug(f"⏳ Aguardando {config.CHECK_INTERVAL}s até próxima checagem...")
-                time.sleep(config.CHECK_INTERVAL)
+                logger.debug("⏳ Aguardando %ss até próxima checagem...", config.CHECK_INTERVAL)
+                self._stop_event.wait(config.CHECK_INTERVAL)
                 
             except KeyboardInterrupt:
                 # Já tratado pelo signal handler
@@ -290,9 +365,10 @@ class VigiloAgent:
                 
             except Exception as e:
                 # Qualquer erro não esperado: loga e continua
-                logger.error(f"❌ Erro crítico no loop principal: {e}", exc_info=True)
+                logger.error("❌ Erro crítico no loop principal: %s", e)
+                logger.debug("Detalhes do erro no loop principal", exc_info=True)
                 logger.info("🔄 Tentando continuar após 30 segundos...")
-                time.sleep(30)
+                self._stop_event.wait(30)
         
         self._shutdown()
     
@@ -302,11 +378,13 @@ class VigiloAgent:
         logger.info("🛑 Encerrando Vigilo Agent")
         logger.info("=" * 60)
         
+        # Aguarda a etapa de inicialização em andamento (ela não inicia
+        # outras após o sinal) antes de usar e fechar as sessões HTTP
+        self._startup_thread.join(timeout=STARTUP_JOIN_TIMEOUT)
+        
         try:
             # Envia notificação de shutdown
-            hostname = self.heartbeat.hostname
-            shutdown_msg = f"🛑 *Vigilo Encerrado*\n\n🖥️ Host: {hostname}\n🕒 {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n\n📊 Checagens realizadas: {self.check_count}"
-            self.notifier.send_message(shutdown_msg, force=True)
+            self.notifier.send_shutdown_notification(self.heartbeat.hostname, self.check_count)
             
             # Envia evento para n8n
             self.heartbeat.send_event("shutdown", {
@@ -315,8 +393,13 @@ class VigiloAgent:
             })
             
         except Exception as e:
-            logger.error(f"Erro durante shutdown: {e}")
-        
+            logger.error("Erro durante shutdown: %s", e, exc_info=True)
+
+        # Libera workers e conexões HTTP persistentes
+        self._executor.shutdown(wait=False)
+        self.notifier.close()
+        self.heartbeat.close()
+
         logger.info("👋 Shutdown completo. Até logo!")
 
 
@@ -329,7 +412,7 @@ def main():
         logger.info("\n⚠️ Interrompido pelo usuário")
         sys.exit(0)
     except Exception as e:
-        logger.critical(f"❌ Erro fatal ao iniciar agente: {e}", exc_info=True)
+        logger.critical("❌ Erro fatal ao iniciar agente: %s", e, exc_info=True)
         sys.exit(1)
 
 
@@ -3,14 +3,53 @@ Módulo de Notificações via Evolution API (WhatsApp)
 Implementa envio de alertas com sistema anti-spam (cooldown)
 """
 
+import array
+import math
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import logging
 from typing import Dict, Any, Optional
-from datetime import datetime
+
+from alerts import AlertType
+from json_utils import dumps
 
 logger = logging.getLogger(__name__)
 
+# Limite de envio de alertas (token bucket): rajada máxima e reposição por segundo
+ALERT_BURST = 5
+ALERT_RATE = 1.0
+
+# Cabeçalhos fixos das mensagens (str: o payload é serializado em JSON)
+_ALERT_PREFIX = "⚠️ *ALERTA VIGILO* ⚠️\n\n"
+_REPORT_PREFIX = "📊 *RELATÓRIO VIGILO*\n\n"
+_STARTUP_PREFIX = "✅ *Vigilo Iniciado*\n\n🖥️ Host: "
+_SHUTDOWN_PREFIX = "🛑 *Vigilo Encerrado*\n\n🖥️ Host: "
+_TIME_SEP = "\n\n🕒 "
+_TIME_LINE = "\n🕒 "
+
+# Último timestamp formatado: (segundo epoch, texto)
+_fmt_cache = (0, "")
+
+
+def _now_str() -> str:
+    """
+    Retorna a data/hora atual formatada para as mensagens
+    
+    O texto é reaproveitado enquanto o segundo não mudar (ex.: rajada de alertas).
+    
+    Returns:
+        Data/hora no formato dd/mm/aaaa HH:MM:SS
+    """
+    global _fmt_cache
+    ts = int(time.time())
+    if ts == _fmt_cache[0]:
+        return _fmt_cache[1]
+    text = time.strftime("%d/%m/%Y %H:%M:%S", time.localtime(ts))
+    _fmt_cache = (ts, text)
+    return text
+
 
 class Notifier:
     """Classe para gerenciar envio de notificações via Evolution API"""
@@ -34,73 +73,104 @@ class Notifier:
         self.notify_number = notify_number
         self.cooldown_seconds = cooldown_seconds
         
-        # Dicionário para rastrear últimos envios de cada tipo de alerta
-        # Formato: {"alert_type": timestamp_ultimo_envio}
-        self._last_alert_sent: Dict[str, float] = {}
+        # Último envio (time.monotonic) de cada tipo de alerta, indexado por
+        # AlertType; -inf indica que o tipo nunca foi enviado
+        self._last_alert_sent = array.array('d', [-math.inf] * len(AlertType))
         
-        logger.info(f"Notificador iniciado para {notify_number} via instância {evolution_instance}")
-    
-    def _build_headers(self) -> Dict[str, str]:
-        """Constrói headers para requisição à Evolution API"""
-        return {
+        # Token bucket dos alertas: só aguarda quando a rajada se esgota
+        self._bucket_tokens = float(ALERT_BURST)
+        self._bucket_last = time.monotonic()
+        
+        # Partes fixas das requisições, montadas uma única vez
+        self._send_url = f"{self.evolution_url}/message/sendText/{evolution_instance}"
+        self._headers = {
             "Content-Type": "application/json",
-            "apikey": self.evolution_token
+            "apikey": evolution_token
         }
-    
-    def _build_payload(self, message: str) -> Dict[str, Any]:
-        """
-        Constrói payload para envio de mensagem
-        
-        Args:
-            message: Texto da mensagem
-            
-        Returns:
-            Payload formatado para Evolution API
-        """
-        return {
-            "number": self.notify_number,
-            "text": message,
+        self._payload_base = {
+            "number": notify_number,
+            "text": "",
             "options": {
                 "delay": 1200,  # Delay de 1.2s para simular digitação
                 "presence": "composing"  # Mostra "digitando..."
             }
         }
+        self._session = self._build_session()
+        
+        logger.info("Notificador iniciado para %s via instância %s", notify_number, evolution_instance)
+    
+    def _build_session(self) -> requests.Session:
+        """
+        Cria uma sessão HTTP persistente (keep-alive) para a Evolution API
+        
+        Returns:
+            Sessão com pool de conexões, retry e headers configurados
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=4,
+            # Retenta falhas de conexão em qualquer método; status 5xx só em
+            # métodos idempotentes (GET), para não duplicar mensagens no WhatsApp
+            max_retries=Retry(
+                total=2,
+                read=0,
+                backoff_factor=0.3,
+                status_forcelist=(502, 503, 504),
+                raise_on_status=False
+            )
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update(self._headers)
+        return session
     
-    def _can_send_alert(self, alert_type: str) -> bool:
+    def _can_send_alert(self, alert_type: AlertType) -> bool:
         """
         Verifica se pode enviar alerta baseado no cooldown
         
         Args:
-            alert_type: Tipo do alerta (ex: "CPU_CRITICAL", "CONTAINER_DOWN")
+            alert_type: Tipo do alerta (ex: AlertType.CPU_CRITICAL)
             
         Returns:
             True se pode enviar, False se está em cooldown
         """
-        current_time = time.time()
-        
-        if alert_type not in self._last_alert_sent:
-            return True
-        
-        time_since_last = current_time - self._last_alert_sent[alert_type]
+        time_since_last = time.monotonic() - self._last_alert_sent[alert_type]
         
         if time_since_last >= self.cooldown_seconds:
             return True
         
         remaining = int(self.cooldown_seconds - time_since_last)
-        logger.info(f"Alerta '{alert_type}' em cooldown. Faltam {remaining}s")
+        logger.info("Alerta '%s' em cooldown. Faltam %ss", alert_type.name, remaining)
         return False
     
-    def _mark_alert_sent(self, alert_type: str) -> None:
+    def _acquire_token(self) -> None:
+        """Consome um token do limite de alertas, aguardando se necessário"""
+        now = time.monotonic()
+        self._bucket_tokens = min(
+            ALERT_BURST, self._bucket_tokens + (now - self._bucket_last) * ALERT_RATE
+        )
+        self._bucket_last = now
+        
+        if self._bucket_tokens < 1:
+            wait = (1 - self._bucket_tokens) / ALERT_RATE
+            time.sleep(wait)
+            self._bucket_tokens = 1.0
+            self._bucket_last = time.monotonic()
+        
+        self._bucket_tokens -= 1
+    
+    def _mark_alert_sent(self, alert_type: AlertType) -> None:
         """
         Marca um alerta como enviado
         
         Args:
             alert_type: Tipo do alerta
         """
-        self._last_alert_sent[alert_type] = time.time()
+        self._last_alert_sent[alert_type] = time.monotonic()
     
     def send_message(self, message: str, force: bool = False, 
-                     alert_type: Optional[str] = None) -> bool:
+                     alert_type: Optional[AlertType] = None) -> bool:
         """
         Envia uma mensagem via Evolution API
         
@@ -113,30 +183,34 @@ class Notifier:
             True se enviado com sucesso, False caso contrário
         """
         # Verifica cooldown se não for forçado e se tiver tipo de alerta
-        if not force and alert_type:
+        if not force and alert_type is not None:
             if not self._can_send_alert(alert_type):
-                logger.debug(f"Mensagem não enviada (cooldown): {alert_type}")
+                logger.debug("Mensagem não enviada (cooldown): %s", alert_type.name)
                 return False
         
+        # Limita a taxa de alertas sem bloquear enquanto houver tokens
+        if alert_type is not None:
+            self._acquire_token()
+        
         try:
-            url = f"{self.evolution_url}/message/sendText/{self.evolution_instance}"
-            headers = self._build_headers()
-            payload = self._build_payload(message)
+            # Cópia rasa: apenas "text" muda; "options" é compartilhado
+            payload = self._payload_base.copy()
+            payload["text"] = message
             
-            logger.debug(f"Enviando mensagem para {self.notify_number}")
+            logger.debug("Enviando mensagem para %s", self.notify_number)
             
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
+            response = self._session.post(self._send_url, data=dumps(payload), timeout=10)
             
             if response.status_code == 200 or response.status_code == 201:
-                logger.info(f"Mensagem enviada com sucesso: {alert_type or 'generic'}")
+                logger.info("Mensagem enviada com sucesso: %s", alert_type.name if alert_type is not None else 'generic')
                 
                 # Marca como enviado apenas se houver tipo de alerta
-                if alert_type:
+                if alert_type is not None:
                     self._mark_alert_sent(alert_type)
                 
                 return True
             else:
-                logger.error(f"Erro ao enviar mensagem. Status: {response.status_code}, Resposta: {response.text}")
+                logger.error("Erro ao enviar mensagem. Status: %s, Resposta: %s", response.status_code, response.text)
                 return False
                 
         except requests.exceptions.Timeout:
@@ -146,7 +220,7 @@ class Notifier:
             logger.error("Erro de conexão com Evolution API")
             return False
         except Exception as e:
-            logger.error(f"Erro inesperado ao enviar mensagem: {e}")
+            logger.error("Erro inesperado ao enviar mensagem: %s", e)
             return False
     
     def send_alert(self, alert: Dict[str, Any]) -> bool:
@@ -159,12 +233,11 @@ class Notifier:
         Returns:
             True se enviado, False caso contrário
         """
-        alert_type = alert.get("type", "UNKNOWN")
+        alert_type = alert.get("type", AlertType.UNKNOWN)
         message = alert.get("message", "Alerta sem mensagem")
         
         # Adiciona timestamp ao alerta
-        timestamp = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        formatted_message = f"⚠️ *ALERTA VIGILO* ⚠️\n\n{message}\n\n🕒 {timestamp}"
+        formatted_message = _ALERT_PREFIX + message + _TIME_SEP + _now_str()
         
         return self.send_message(formatted_message, alert_type=alert_type)
     
@@ -183,8 +256,6 @@ class Notifier:
         for alert in alerts:
             if self.send_alert(alert):
                 sent_count += 1
-                # Pequeno delay entre mensagens para não sobrecarregar
-                time.sleep(1)
         
         return sent_count
     
@@ -198,8 +269,7 @@ class Notifier:
         Returns:
             True se enviado, False caso contrário
         """
-        timestamp = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        formatted_message = f"📊 *RELATÓRIO VIGILO*\n\n{report_text}\n\n🕒 {timestamp}"
+        formatted_message = _REPORT_PREFIX + report_text + _TIME_SEP + _now_str()
         
         # Relatórios são sempre enviados (force=True)
         return self.send_message(formatted_message, force=True)
@@ -214,7 +284,24 @@ class Notifier:
         Returns:
             True se enviado, False caso contrário
         """
-        message = f"✅ *Vigilo Iniciado*\n\n🖥️ Host: {hostname}\n🕒 {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}"
+        message = _STARTUP_PREFIX + hostname + _TIME_LINE + _now_str()
+        return self.send_message(message, force=True)
+    
+    def send_shutdown_notification(self, hostname: str, check_count: int) -> bool:
+        """
+        Envia notificação de encerramento do agente
+        
+        Args:
+            hostname: Nome do host
+            check_count: Número de checagens realizadas
+            
+        Returns:
+            True se enviado, False caso contrário
+        """
+        message = (
+            _SHUTDOWN_PREFIX + hostname + _TIME_LINE + _now_str()
+            + "\n\n📊 Checagens realizadas: " + str(check_count)
+        )
         return self.send_message(message, force=True)
     
     def test_connection(self) -> bool:
@@ -227,19 +314,17 @@ class Notifier:
         try:
             # Tenta fazer uma requisição simples para verificar conectividade
             url = f"{self.evolution_url}/instance/connectionState/{self.evolution_instance}"
-            headers = self._build_headers()
-            
-            response = requests.get(url, headers=headers, timeout=5)
+            response = self._session.get(url, timeout=5)
             
             if response.status_code == 200:
                 logger.info("Conexão com Evolution API OK")
                 return True
             else:
-                logger.warning(f"Evolution API respondeu com status {response.status_code}")
+                logger.warning("Evolution API respondeu com status %s", response.status_code)
                 return False
                 
         except Exception as e:
-            logger.error(f"Erro ao testar conexão com Evolution API: {e}")
+            logger.error("Erro ao testar conexão com Evolution API: %s", e)
             return False
     
     def get_cooldown_status(self) -> Dict[str, str]:
@@ -249,17 +334,23 @@ class Notifier:
         Returns:
             Dicionário com tempo restante de cooldown para cada tipo
         """
-        current_time = time.time()
+        current_time = time.monotonic()
         status = {}
         
-        for alert_type, last_sent in self._last_alert_sent.items():
+        for alert_type in AlertType:
+            last_sent = self._last_alert_sent[alert_type]
+            if last_sent == -math.inf:
+                continue
             time_since = current_time - last_sent
             
             if time_since < self.cooldown_seconds:
                 remaining = int(self.cooldown_seconds - time_since)
-                status[alert_type] = f"{remaining}s restantes"
+                status[alert_type.name] = f"{remaining}s restantes"
             else:
-                status[alert_type] = "Pronto para enviar"
+                status[alert_type.name] = "Pronto para enviar"
         
         return status
-
+    
+    def close(self) -> None:
+        """Fecha a sessão HTTP e libera as conexões do pool"""
+        self._session.close()
@@ -3,21 +3,161 @@ Módulo de Monitoramento de Sistema (Host)
 Monitora CPU, RAM, Disco e Uptime da VPS
 """
 
-import psutil
+import os
 import time
-from typing import Dict, Any, List, Tuple
-from datetime import timedelta
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import logging
 
+from alerts import AlertType
+
 logger = logging.getLogger(__name__)
 
+# Fator de conversão de bytes para GiB (multiplicação em vez de divisão)
+_GIB = 1.0 / (1024 ** 3)
+
+# Janela mínima (segundos) entre duas amostras de CPU: com poucos ticks de
+# /proc/stat no intervalo o percentual sai 0% ou 100%
+CPU_MIN_WINDOW = 1.0
+
+# Modelo do relatório do sistema (preenchido com as stats e os emojis)
+_REPORT_TMPL = (
+    "📊 *Relatório do Sistema*\n"
+    "\n"
+    "{cpu_emoji} *CPU:* {cpu_percent:.2f}%\n"
+    "{ram_emoji} *RAM:* {ram_percent:.2f}% ({ram_used_gb:.2f}GB / {ram_total_gb:.2f}GB)\n"
+    "{disk_emoji} *Disco:* {disk_percent:.2f}% ({disk_used_gb:.2f}GB / {disk_total_gb:.2f}GB)\n"
+    "\n"
+    "⏱️ *Uptime:* {uptime}\n"
+    "🔢 *Processos:* {process_count}"
+)
+
+# Variante do modo PER_CPU: mostra também o núcleo mais carregado, que é
+# a métrica usada no alerta de CPU
+_REPORT_TMPL_PER_CPU = _REPORT_TMPL.replace(
+    "{cpu_percent:.2f}%\n", "{cpu_percent:.2f}% (máx. núcleo {cpu_max:.2f}%)\n"
+)
+
+
+def _parse_cpu_line(line: bytes) -> Tuple[int, int]:
+    """
+    Converte uma linha "cpu"/"cpuN" de /proc/stat em ticks
+    
+    Args:
+        line: Linha crua de /proc/stat
+        
+    Returns:
+        Tupla (ticks ocupados, ticks totais); guest/guest_nice já estão
+        contabilizados em user/nice e ficam de fora
+    """
+    user, nice, system, idle, iowait, irq, softirq, steal = (
+        int(v) for v in line.split()[1:9]
+    )
+    total = user + nice + system + idle + iowait + irq + softirq + steal
+    return total - idle - iowait, total
+
+
+def _read_cpu_times(per_cpu: bool = False) -> List[Tuple[int, int]]:
+    """
+    Lê os tempos de CPU de /proc/stat
+    
+    Args:
+        per_cpu: Se True, inclui também as linhas de cada núcleo
+        
+    Returns:
+        Lista de (ticks ocupados, ticks totais): o agregado primeiro,
+        seguido de um item por núcleo quando per_cpu
+    """
+    with open('/proc/stat', 'rb') as f:
+        samples = [_parse_cpu_line(f.readline())]
+        if per_cpu:
+            for line in f:
+                if not line.startswith(b'cpu'):
+                    break
+                samples.append(_parse_cpu_line(line))
+    return samples
+
+
+def _delta_percent(previous: Tuple[int, int], current: Tuple[int, int]) -> float:
+    """
+    Calcula o percentual ocupado entre duas amostras de ticks
+    
+    Args:
+        previous: Amostra anterior (ocupados, totais)
+        current: Amostra atual (ocupados, totais)
+        
+    Returns:
+        Percentual de CPU ocupada no intervalo
+    """
+    total_delta = current[1] - previous[1]
+    if total_delta <= 0:
+        return 0.0
+    return (current[0] - previous[0]) / total_delta * 100.0
+
+
+def _read_meminfo(key: bytes) -> int:
+    """
+    Lê um campo de /proc/meminfo
+    
+    Args:
+        key: Prefixo da linha (ex.: b'MemAvailable:')
+        
+    Returns:
+        Valor em bytes (0 se o campo não existir)
+    """
+    with open('/proc/meminfo', 'rb') as f:
+        for line in f:
+            if line.startswith(key):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def _read_uptime() -> float:
+    """
+    Lê o uptime do host em segundos de /proc/uptime
+    
+    Returns:
+        Segundos desde o boot
+    """
+    with open('/proc/uptime', 'rb') as f:
+        return float(f.read().split()[0])
+
+
+def _fmt_uptime(seconds: int) -> str:
+    """
+    Formata segundos no mesmo formato de str(timedelta), sem criar o objeto
+    
+    Args:
+        seconds: Duração em segundos inteiros
+        
+    Returns:
+        Texto como "4:23:10" ou "15 days, 4:23:10"
+    """
+    days, rem = divmod(seconds, 86400)
+    hours, rem = divmod(rem, 3600)
+    minutes, secs = divmod(rem, 60)
+    hms = f"{hours}:{minutes:02}:{secs:02}"
+    if days:
+        return f"{days} day{'s' if days != 1 else ''}, {hms}"
+    return hms
+
+
+def _count_processes() -> int:
+    """
+    Conta os processos (diretórios numéricos em /proc)
+    
+    Returns:
+        Quantidade de processos
+    """
+    return sum(1 for name in os.listdir('/proc') if name.isdigit())
+
 
 class SystemMonitor:
     """Classe responsável por monitorar recursos do host"""
     
     def __init__(self, cpu_threshold: float = 85.0, 
                  ram_threshold: float = 90.0, 
-                 disk_threshold: float = 90.0):
+                 disk_threshold: float = 90.0,
+                 per_cpu: bool = False):
         """
         Inicializa o monitor de sistema
         
@@ -25,67 +165,198 @@ class SystemMonitor:
             cpu_threshold: Limiar de CPU em % para alertas
             ram_threshold: Limiar de RAM em % para alertas
             disk_threshold: Limiar de Disco em % para alertas
+            per_cpu: Se True, coleta também o núcleo mais carregado (cpu_max)
+                e o usa no alerta de CPU
         """
         self.CPU_THRESHOLD = cpu_threshold
         self.RAM_THRESHOLD = ram_threshold
         self.DISK_THRESHOLD = disk_threshold
+        self.per_cpu = per_cpu
+        
+        # Com per_cpu, alerta e emoji da CPU seguem o núcleo mais carregado
+        if per_cpu:
+            cpu_metric, cpu_label = "cpu_max", "CPU (núcleo mais carregado)"
+            self._report_tmpl = _REPORT_TMPL_PER_CPU
+        else:
+            cpu_metric, cpu_label = "cpu_percent", "CPU"
+            self._report_tmpl = _REPORT_TMPL
+        
+        # (chave do emoji, métrica, limiar) usados no relatório
+        self._emoji_specs = (
+            ("cpu_emoji", cpu_metric, cpu_threshold),
+            ("ram_emoji", "ram_percent", ram_threshold),
+            ("disk_emoji", "disk_percent", disk_threshold),
+        )
+        
+        # (métrica, limiar, rótulo, tipo, severidade, prefixo dos campos em GB)
+        self._threshold_specs = (
+            (cpu_metric, cpu_threshold, cpu_label, AlertType.CPU_CRITICAL, "high", None),
+            ("ram_percent", ram_threshold, "RAM", AlertType.RAM_CRITICAL, "high", "ram"),
+            ("disk_percent", disk_threshold, "DISCO", AlertType.DISK_CRITICAL, "critical", "disk"),
+        )
+        
+        # Valores que não mudam durante a vida do agente
+        self._mem_total = _read_meminfo(b'MemTotal:')
+        self._ram_total_gb = self._mem_total * _GIB
+        disk = os.statvfs('/')
+        self._disk_total_gb = disk.f_blocks * disk.f_frsize * _GIB
+        self._boot_time = time.time() - _read_uptime()
+        
+        # Amostra inicial de CPU: a primeira leitura em _cpu_percent (via
+        # quick_probe, chamado também por full_stats) é calculada em relação a ela
+        self._cpu_prev = _read_cpu_times(per_cpu)
+        self._cpu_prev_at = time.monotonic()
     
-    def get_system_stats(self) -> Dict[str, Any]:
+    def _cpu_percent(self) -> Tuple[float, float]:
         """
-        Coleta estatísticas atuais do sistema
+        Calcula o uso de CPU desde a leitura anterior
+        
+        Se a leitura anterior tiver menos de CPU_MIN_WINDOW segundos (ex.:
+        primeira checagem logo após a inicialização), espera completar a janela.
         
         Returns:
-            Dicionário com métricas do sistema
+            Tupla (percentual agregado, percentual do núcleo mais carregado);
+            sem per_cpu, o segundo valor repete o agregado
+        """
+        elapsed = time.monotonic() - self._cpu_prev_at
+        if elapsed < CPU_MIN_WINDOW:
+            time.sleep(CPU_MIN_WINDOW - elapsed)
+        
+        samples = _read_cpu_times(self.per_cpu)
+        previous = self._cpu_prev
+        self._cpu_prev = samples
+        self._cpu_prev_at = time.monotonic()
+        
+        aggregate = _delta_percent(previous[0], samples[0])
+        if len(samples) == 1:
+            return aggregate, aggregate
+        return aggregate, max(
+            _delta_percent(prev, cur) for prev, cur in zip(previous[1:], samples[1:])
+        )
+    
+    def quick_probe(self) -> Dict[str, Any]:
+        """
+        Coleta as métricas usadas a cada ciclo (limiares e heartbeat)
+        
+        Lê apenas /proc/stat, /proc/meminfo e statvfs; uptime formatado e
+        contagem de processos ficam para full_stats.
+        
+        Returns:
+            Dicionário com percentuais, uso em GB, uptime em segundos e timestamp
         """
         try:
-            # CPU (percentual médio dos últimos segundos)
-            cpu_percent = psutil.cpu_percent(interval=1)
-            
-            # Memória RAM
-            memory = psutil.virtual_memory()
-            ram_percent = memory.percent
-            ram_used_gb = memory.used / (1024 ** 3)
-            ram_total_gb = memory.total / (1024 ** 3)
+            # CPU (percentual médio desde a leitura anterior, ou seja,
+            # ao longo do último CHECK_INTERVAL; só bloqueia se a leitura
+            # anterior tiver menos de CPU_MIN_WINDOW segundos)
+            cpu_percent, cpu_max = self._cpu_percent()
             
-            # Disco (partição raiz)
-            disk = psutil.disk_usage('/')
-            disk_percent = disk.percent
-            disk_used_gb = disk.used / (1024 ** 3)
-            disk_total_gb = disk.total / (1024 ** 3)
+            # Memória RAM (usada = total - disponível)
+            mem_used = self._mem_total - _read_meminfo(b'MemAvailable:')
+            ram_percent = mem_used / self._mem_total * 100 if self._mem_total else 0.0
+            ram_used_gb = mem_used * _GIB
             
-            # Uptime
-            boot_time = psutil.boot_time()
-            uptime_seconds = time.time() - boot_time
-            uptime_str = str(timedelta(seconds=int(uptime_seconds)))
+            # Disco (partição raiz); percentual sobre o espaço acessível a
+            # usuários comuns, excluindo os blocos reservados ao root
+            disk = os.statvfs('/')
+            disk_used = (disk.f_blocks - disk.f_bfree) * disk.f_frsize
+            disk_usable = disk_used + disk.f_bavail * disk.f_frsize
+            disk_percent = disk_used / disk_usable * 100 if disk_usable else 0.0
+            disk_used_gb = disk_used * _GIB
             
-            # Contagem de processos
-            process_count = len(psutil.pids())
+            # Uptime (a partir do instante de boot calculado na inicialização)
+            now = time.time()
+            uptime_seconds = now - self._boot_time
             
             stats = {
-                "cpu_percent": round(cpu_percent, 2),
-                "ram_percent": round(ram_percent, 2),
-                "ram_used_gb": round(ram_used_gb, 2),
-                "ram_total_gb": round(ram_total_gb, 2),
-                "disk_percent": round(disk_percent, 2),
-                "disk_used_gb": round(disk_used_gb, 2),
-                "disk_total_gb": round(disk_total_gb, 2),
-                "uptime": uptime_str,
+                "cpu_percent": cpu_percent,
+                "cpu_max": cpu_max,
+                "ram_percent": ram_percent,
+                "ram_used_gb": ram_used_gb,
+                "ram_total_gb": self._ram_total_gb,
+                "disk_percent": disk_percent,
+                "disk_used_gb": disk_used_gb,
+                "disk_total_gb": self._disk_total_gb,
                 "uptime_seconds": int(uptime_seconds),
-                "process_count": process_count,
-                "timestamp": int(time.time())
+                "timestamp": int(now)
             }
             
-            logger.debug(f"Estatísticas do sistema coletadas: CPU={cpu_percent}%, RAM={ram_percent}%, Disk={disk_percent}%")
+            logger.debug("Estatísticas do sistema coletadas: CPU=%.2f%%, RAM=%.2f%%, Disk=%.2f%%", cpu_percent, ram_percent, disk_percent)
             
             return stats
             
         except Exception as e:
-            logger.error(f"Erro ao coletar estatísticas do sistema: {e}")
+            logger.error("Erro ao coletar estatísticas do sistema: %s", e)
             return {
                 "error": str(e),
                 "timestamp": int(time.time())
             }
     
+    def full_stats(self, probe: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Completa as métricas com os dados usados apenas no relatório
+        
+        Args:
+            probe: Resultado de quick_probe do ciclo atual (se None, coleta
+                um novo; reaproveitar evita reiniciar a janela de CPU)
+            
+        Returns:
+            Dicionário com todas as métricas do sistema
+        """
+        stats = dict(probe) if probe is not None else self.quick_probe()
+        if "error" in stats:
+            return stats
+        
+        try:
+            stats["uptime"] = _fmt_uptime(stats["uptime_seconds"])
+            stats["process_count"] = _count_processes()
+        except Exception as e:
+            logger.error("Erro ao coletar estatísticas do sistema: %s", e)
+            return {
+                "error": str(e),
+                "timestamp": int(time.time())
+            }
+        return stats
+    
+    def get_system_stats(self) -> Dict[str, Any]:
+        """
+        Coleta estatísticas atuais do sistema
+        
+        Returns:
+            Dicionário com métricas do sistema
+        """
+        return self.full_stats()
+    
+    def iter_threshold_alerts(self, stats: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Gera os alertas dos recursos que ultrapassaram o limiar
+        
+        Nada é alocado quando nenhum limiar é ultrapassado (caso comum).
+        
+        Args:
+            stats: Estatísticas do sistema
+            
+        Yields:
+            Alertas críticos detectados, um por recurso
+        """
+        # Verifica se há erro nas stats
+        if "error" in stats:
+            return
+        
+        # Alertas de CPU, RAM e Disco
+        for metric, threshold, label, alert_type, severity, gb_prefix in self._threshold_specs:
+            value = stats[metric]
+            if value > threshold:
+                alert = {
+                    "type": alert_type,
+                    "severity": severity,
+                    "message": f"🔴 {label} em {value:.2f}% (limite: {threshold}%)",
+                    "value": round(value, 2),
+                    "threshold": threshold
+                }
+                if gb_prefix:
+                    alert["details"] = f"{stats[gb_prefix + '_used_gb']:.2f}GB / {stats[gb_prefix + '_total_gb']:.2f}GB"
+                yield alert
+    
     def check_thresholds(self, stats: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Verifica se algum recurso ultrapassou o limiar
@@ -96,46 +367,10 @@ class SystemMonitor:
         Returns:
             Lista de alertas críticos detectados
         """
-        alerts = []
-        
-        # Verifica se há erro nas stats
-        if "error" in stats:
-            return alerts
-        
-        # Alerta de CPU
-        if stats["cpu_percent"] > self.CPU_THRESHOLD:
-            alerts.append({
-                "type": "CPU_CRITICAL",
-                "severity": "high",
-                "message": f"🔴 CPU em {stats['cpu_percent']}% (limite: {self.CPU_THRESHOLD}%)",
-                "value": stats["cpu_percent"],
-                "threshold": self.CPU_THRESHOLD
-            })
-        
-        # Alerta de RAM
-        if stats["ram_percent"] > self.RAM_THRESHOLD:
-            alerts.append({
-                "type": "RAM_CRITICAL",
-                "severity": "high",
-                "message": f"🔴 RAM em {stats['ram_percent']}% (limite: {self.RAM_THRESHOLD}%)",
-                "value": stats["ram_percent"],
-                "threshold": self.RAM_THRESHOLD,
-                "details": f"{stats['ram_used_gb']}GB / {stats['ram_total_gb']}GB"
-            })
-        
-        # Alerta de Disco
-        if stats["disk_percent"] > self.DISK_THRESHOLD:
-            alerts.append({
-                "type": "DISK_CRITICAL",
-                "severity": "critical",
-                "message": f"🔴 DISCO em {stats['disk_percent']}% (limite: {self.DISK_THRESHOLD}%)",
-                "value": stats["disk_percent"],
-                "threshold": self.DISK_THRESHOLD,
-                "details": f"{stats['disk_used_gb']}GB / {stats['disk_total_gb']}GB"
-            })
+        alerts = list(self.iter_threshold_alerts(stats))
         
         if alerts:
-            logger.warning(f"Detectados {len(alerts)} alertas críticos de sistema")
+            logger.warning("Detectados %d alertas críticos de sistema", len(alerts))
         
         return alerts
     
@@ -153,19 +388,9 @@ class SystemMonitor:
             return f"❌ Erro ao coletar dados do sistema: {stats['error']}"
         
         # Emojis baseados nos níveis
-        cpu_emoji = "🟢" if stats["cpu_percent"] < self.CPU_THRESHOLD else "🔴"
-        ram_emoji = "🟢" if stats["ram_percent"] < self.RAM_THRESHOLD else "🔴"
-        disk_emoji = "🟢" if stats["disk_percent"] < self.DISK_THRESHOLD else "🔴"
-        
-        report = f"""📊 *Relatório do Sistema*
-
-{cpu_emoji} *CPU:* {stats['cpu_percent']}%
-{ram_emoji} *RAM:* {stats['ram_percent']}% ({stats['ram_used_gb']}GB / {stats['ram_total_gb']}GB)
-{disk_emoji} *Disco:* {stats['disk_percent']}% ({stats['disk_used_gb']}GB / {stats['disk_total_gb']}GB)
-
-⏱️ *Uptime:* {stats['uptime']}
-🔢 *Processos:* {stats['process_count']}
-"""
+        view = dict(stats)
+        for emoji_key, metric, threshold in self._emoji_specs:
+            view[emoji_key] = "🟢" if stats[metric] < threshold else "🔴"
         
-        return report.strip()
+        return self._report_tmpl.format_map(view)
 
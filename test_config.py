@@ -6,15 +6,74 @@ Valida se todas as variáveis de ambiente estão configuradas corretamente
 
 import sys
 import os
+import io
+import importlib
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Adiciona o diretório src ao path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
+# Carrega a configuração uma única vez e compartilha entre os testes
+try:
+    from config import config as CONFIG
+    CONFIG_ERROR = None
+except (ValueError, ImportError) as e:
+    CONFIG = None
+    CONFIG_ERROR = e
+
+# Dependências verificadas por test_imports
+# ('docker' é verificado apenas em test_docker_monitor, se ele chegar a rodar)
+_MODULES = ('requests', 'dotenv')
+
+_BAR = "=" * 60 + "\n"
+
+_BANNER = (
+    "\n\n"
+    "╔════════════════════════════════════════════════════════╗\n"
+    "║          VIGILO - TESTE DE CONFIGURAÇÃO               ║\n"
+    "╚════════════════════════════════════════════════════════╝\n"
+)
+
+class _BufferedStdout:
+    """
+    Encaminha a saída de cada thread de teste para um buffer próprio
+    
+    Um segundo proxy pode compartilhar o mesmo `local` (ex.: para sys.stderr),
+    de modo que logs e prints de um teste caiam no mesmo buffer, em ordem.
+    """
+    
+    def __init__(self, stream, local=None):
+        self._stream = stream
+        self._local = local if local is not None else threading.local()
+    
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            return self._stream.write(text)
+        return buffer.write(text)
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+def _run_buffered(stdout, fn, *args):
+    """
+    Executa um teste guardando sua saída em memória
+    
+    Returns:
+        Tupla (resultado do teste, texto impresso)
+    """
+    stdout._local.buffer = io.StringIO()
+    try:
+        return fn(*args), stdout._local.buffer.getvalue()
+    finally:
+        stdout._local.buffer = None
+
 def print_header(text):
     """Imprime um cabeçalho formatado"""
-    print("\n" + "=" * 60)
-    print(f"  {text}")
-    print("=" * 60)
+    sys.stdout.write("\n" + _BAR + f"  {text}\n" + _BAR)
 
 def print_success(text):
     """Imprime mensagem de sucesso"""
@@ -28,21 +87,45 @@ def print_warning(text):
     """Imprime mensagem de aviso"""
     print(f"⚠️  {text}")
 
+def print_skip(text):
+    """Imprime mensagem de teste pulado"""
+    print(f"⏭️  {text}")
+
+@functools.lru_cache(maxsize=None)
+def _cached_import(name):
+    """Importa um módulo, reaproveitando o que já estiver em sys.modules"""
+    module = sys.modules.get(name)
+    return module if module is not None else importlib.import_module(name)
+
+def _probe(fn, attempts=3, backoff=0.25, required=2):
+    """
+    Repete um teste de conexão tolerando falhas transitórias
+    
+    Considera a conexão OK quando `required` tentativas dão certo, com
+    espera exponencial entre tentativas. Para assim que o resultado estiver
+    decidido.
+    
+    Returns:
+        True se houve ao menos `required` sucessos em `attempts` tentativas
+    """
+    ok = 0
+    for i in range(attempts):
+        if fn():
+            ok += 1
+        if ok >= required:
+            return True
+        if ok + (attempts - i - 1) < required:
+            return False
+        time.sleep(backoff * (2 ** i))
+    return False
+
 def test_imports():
     """Testa se todos os módulos podem ser importados"""
-    print_header("Testando Importações")
-    
-    modules = [
-        'psutil',
-        'docker',
-        'requests',
-        'dotenv'
-    ]
     
     all_ok = True
-    for module in modules:
+    for module in _MODULES:
         try:
-            __import__(module)
+            _cached_import(module)
             print_success(f"Módulo '{module}' importado com sucesso")
         except ImportError as e:
             print_error(f"Erro ao importar '{module}': {e}")
@@ -50,13 +133,17 @@ def test_imports():
     
     return all_ok
 
-def test_config():
+def test_config(config):
     """Testa se a configuração pode ser carregada"""
-    print_header("Testando Configuração")
+    
+    if config is None:
+        print_error(f"Erro na configuração: {CONFIG_ERROR}")
+        return False
     
     try:
-        from config import config
         print_success("Configuração carregada com sucesso")
+        if config.compiled_path:
+            print_warning(f"Usando snapshot compilado {config.compiled_path} (ambiente e .env ignorados)")
         
         # Mostra configuração (sem expor tokens)
         print(f"\n📋 Configuração:")
@@ -64,27 +151,26 @@ def test_config():
         print(f"   REPORT_HOURS: {config.REPORT_HOURS}h")
         print(f"   ALERT_COOLDOWN: {config.ALERT_COOLDOWN}s")
         print(f"   TZ: {config.TZ}")
-        print(f"   WATCH_CONTAINERS: {config.WATCH_CONTAINERS or 'Nenhum'}")
+        print(f"   WATCH_CONTAINERS: {list(config.WATCH_CONTAINERS_ORDERED) or 'Nenhum'}")
         print(f"   CPU_THRESHOLD: {config.CPU_THRESHOLD}%")
         print(f"   RAM_THRESHOLD: {config.RAM_THRESHOLD}%")
         print(f"   DISK_THRESHOLD: {config.DISK_THRESHOLD}%")
         print(f"   LOG_LEVEL: {config.LOG_LEVEL}")
         
         return True
-    except ValueError as e:
-        print_error(f"Erro na configuração: {e}")
-        return False
     except Exception as e:
         print_error(f"Erro inesperado: {e}")
         return False
 
-def test_system_monitor():
+def test_system_monitor(config):
     """Testa o monitor de sistema"""
-    print_header("Testando Monitor de Sistema")
+    
+    if config is None:
+        print_error("Configuração indisponível")
+        return False
     
     try:
         from system_mon import SystemMonitor
-        from config import config
         
         monitor = SystemMonitor(
             cpu_threshold=config.CPU_THRESHOLD,
@@ -102,19 +188,23 @@ def test_system_monitor():
             return False
         
         print_success("Métricas coletadas:")
-        print(f"   CPU: {stats['cpu_percent']}%")
-        print(f"   RAM: {stats['ram_percent']}% ({stats['ram_used_gb']}GB / {stats['ram_total_gb']}GB)")
-        print(f"   Disco: {stats['disk_percent']}% ({stats['disk_used_gb']}GB / {stats['disk_total_gb']}GB)")
-        print(f"   Uptime: {stats['uptime']}")
+        print(
+            f"   CPU: {stats['cpu_percent']:.2f}%\n"
+            f"   RAM: {stats['ram_percent']:.2f}% ({stats['ram_used_gb']:.2f}GB / {stats['ram_total_gb']:.2f}GB)\n"
+            f"   Disco: {stats['disk_percent']:.2f}% ({stats['disk_used_gb']:.2f}GB / {stats['disk_total_gb']:.2f}GB)\n"
+            f"   Uptime: {stats['uptime']}"
+        )
         
-        # Verifica alertas
-        alerts = monitor.check_thresholds(stats)
-        if alerts:
+        # Verifica alertas (sem montar lista quando não há nenhum)
+        alerts_iter = monitor.iter_threshold_alerts(stats)
+        first = next(alerts_iter, None)
+        if first is None:
+            print_success("Nenhum alerta detectado")
+        else:
+            alerts = [first, *alerts_iter]
             print_warning(f"{len(alerts)} alertas detectados:")
             for alert in alerts:
                 print(f"      - {alert['message']}")
-        else:
-            print_success("Nenhum alerta detectado")
         
         return True
         
@@ -122,15 +212,28 @@ def test_system_monitor():
         print_error(f"Erro ao testar SystemMonitor: {e}")
         return False
 
-def test_docker_monitor():
+def test_docker_monitor(config):
     """Testa o monitor Docker"""
-    print_header("Testando Monitor Docker")
+    
+    if config is None:
+        print_error("Configuração indisponível")
+        return False
+    
+    try:
+        _cached_import('docker')
+    except ImportError as e:
+        print_error(f"Erro ao importar 'docker': {e}")
+        return False
+    print_success("Módulo 'docker' importado com sucesso")
     
     try:
         from docker_mon import DockerMonitor
-        from config import config
         
-        monitor = DockerMonitor(watch_containers=config.WATCH_CONTAINERS)
+        monitor = DockerMonitor(
+            watch_containers=config.WATCH_CONTAINERS_ORDERED,
+            watch_all=False,
+            ignore_containers=config.IGNORE_CONTAINERS
+        )
         
         if not monitor.is_connected():
             print_error("Não conectado ao Docker")
@@ -139,29 +242,35 @@ def test_docker_monitor():
         
         print_success("Conectado ao Docker")
         
-        # Lista containers
-        containers = monitor.get_all_containers()
-        print_success(f"Total de containers: {len(containers)}")
-        
-        running = [c for c in containers if c['status'] == 'running']
-        print(f"   Rodando: {len(running)}")
-        
-        if config.WATCH_CONTAINERS:
-            print(f"\n📋 Containers monitorados:")
-            for name in config.WATCH_CONTAINERS:
-                container = next((c for c in containers if c['name'] == name), None)
+        if config.WATCH_CONTAINERS_ORDERED:
+            # Consulta só os containers monitorados (filtro aplicado pelo daemon)
+            containers = monitor.get_containers_by_name(config.WATCH_CONTAINERS_ORDERED)
+            print_success(f"Containers monitorados encontrados: {len(containers)}/{len(config.WATCH_CONTAINERS_ORDERED)}")
+            
+            lines = ["\n📋 Containers monitorados:"]
+            by_name = {c.name: c for c in containers}
+            for name in config.WATCH_CONTAINERS_ORDERED:
+                container = by_name.get(name)
                 if container:
-                    status_emoji = "🟢" if container['status'] == 'running' else "🔴"
-                    print(f"   {status_emoji} {name}: {container['status']}")
+                    status_emoji = "🟢" if container.status == 'running' else "🔴"
+                    lines.append(f"   {status_emoji} {name}: {container.status}")
                 else:
-                    print(f"   ❌ {name}: NÃO ENCONTRADO")
+                    lines.append(f"   ❌ {name}: NÃO ENCONTRADO")
+            print("\n".join(lines))
             
-            # Verifica alertas
-            alerts = monitor.check_watched_containers()
+            # Verifica alertas sobre a mesma listagem filtrada
+            alerts = monitor.alerts_for(config.WATCH_CONTAINERS_ORDERED, by_name)
             if alerts:
                 print_warning(f"\n{len(alerts)} alertas detectados:")
                 for alert in alerts:
                     print(f"      - {alert['message']}")
+        else:
+            # Lista containers
+            containers = monitor.get_all_containers(with_size=False)
+            print_success(f"Total de containers: {len(containers)}")
+            
+            running_count = sum(1 for c in containers if c.status == 'running')
+            print(f"   Rodando: {running_count}")
         
         return True
         
@@ -169,13 +278,15 @@ def test_docker_monitor():
         print_error(f"Erro ao testar DockerMonitor: {e}")
         return False
 
-def test_notifier():
+def test_notifier(config):
     """Testa o notificador (sem enviar mensagem real)"""
-    print_header("Testando Notificador")
+    
+    if config is None:
+        print_error("Configuração indisponível")
+        return False
     
     try:
         from notifier import Notifier
-        from config import config
         
         notifier = Notifier(
             evolution_url=config.EVOLUTION_URL,
@@ -193,7 +304,7 @@ def test_notifier():
         
         # Teste de conexão
         print("\n🔍 Testando conexão com Evolution API...")
-        if notifier.test_connection():
+        if _probe(notifier.test_connection):
             print_success("Conexão OK")
             return True
         else:
@@ -204,13 +315,15 @@ def test_notifier():
         print_error(f"Erro ao testar Notifier: {e}")
         return False
 
-def test_heartbeat():
+def test_heartbeat(config):
     """Testa o heartbeat (sem enviar payload real)"""
-    print_header("Testando Heartbeat")
+    
+    if config is None:
+        print_error("Configuração indisponível")
+        return False
     
     try:
         from heartbeat import Heartbeat
-        from config import config
         
         heartbeat = Heartbeat(webhook_url=config.N8N_HEARTBEAT_URL)
         
@@ -220,7 +333,7 @@ def test_heartbeat():
         
         # Teste de conexão
         print("\n🔍 Testando conexão com n8n webhook...")
-        if heartbeat.test_connection():
+        if _probe(heartbeat.test_connection):
             print_success("Conexão OK")
             return True
         else:
@@ -233,26 +346,66 @@ def test_heartbeat():
 
 def main():
     """Função principal"""
-    print("\n")
-    print("╔════════════════════════════════════════════════════════╗")
-    print("║          VIGILO - TESTE DE CONFIGURAÇÃO               ║")
-    print("╚════════════════════════════════════════════════════════╝")
+    sys.stdout.write(_BANNER)
     
-    results = {
-        "Importações": test_imports(),
-        "Configuração": test_config(),
-        "Monitor Sistema": test_system_monitor(),
-        "Monitor Docker": test_docker_monitor(),
-        "Notificador": test_notifier(),
-        "Heartbeat": test_heartbeat()
-    }
+    # (nome, cabeçalho da seção, função, argumentos, teste do qual depende)
+    tests = (
+        ("Importações", "Testando Importações", test_imports, (), None),
+        ("Configuração", "Testando Configuração", test_config, (CONFIG,), "Importações"),
+        ("Monitor Sistema", "Testando Monitor de Sistema", test_system_monitor, (CONFIG,), "Configuração"),
+        ("Monitor Docker", "Testando Monitor Docker", test_docker_monitor, (CONFIG,), "Configuração"),
+        ("Notificador", "Testando Notificador", test_notifier, (CONFIG,), "Configuração"),
+        ("Heartbeat", "Testando Heartbeat", test_heartbeat, (CONFIG,), "Configuração"),
+    )
+    
+    # Pares (nome, resultado) na ordem de execução: True (passou),
+    # False (falhou) ou None (pulado). status indexa o mesmo resultado
+    # por nome para resolver as dependências
+    results = []
+    status = {}
+    
+    # Os testes rodam em ondas: cada onda reúne os que já tiveram a dependência
+    # resolvida. Dentro de uma onda eles esperam por I/O (socket Docker, HTTP)
+    # e rodam em paralelo; a saída de cada um é impressa em ordem ao final.
+    # stderr (onde o logging escreve) usa o mesmo buffer, para que avisos
+    # dos módulos apareçam na seção do teste que os gerou
+    stdout = sys.stdout = _BufferedStdout(sys.stdout)
+    stderr = sys.stderr = _BufferedStdout(sys.stderr, stdout._local)
+    try:
+        with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+            pending = list(tests)
+            while pending:
+                wave = [t for t in pending if t[4] is None or t[4] in status]
+                pending = [t for t in pending if t not in wave]
+                
+                futures = [
+                    None if parent is not None and not status[parent]
+                    else executor.submit(_run_buffered, stdout, fn, *args)
+                    for name, _, fn, args, parent in wave
+                ]
+                
+                for (name, header, _, _, parent), future in zip(wave, futures):
+                    print_header(header)
+                    if future is None:
+                        passed = None
+                        print_skip(f"PULADO ({parent} não passou)")
+                    else:
+                        passed, output = future.result()
+                        stdout.write(output)
+                    status[name] = passed
+                    results.append((name, passed))
+    finally:
+        sys.stdout = stdout._stream
+        sys.stderr = stderr._stream
     
     # Resumo
     print_header("Resumo dos Testes")
     
     all_passed = True
-    for test_name, passed in results.items():
-        if passed:
+    for test_name, passed in results:
+        if passed is None:
+            print_skip(f"{test_name}: PULADO")
+        elif passed:
             print_success(f"{test_name}: PASSOU")
         else:
             print_error(f"{test_name}: FALHOU")